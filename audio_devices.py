@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Audio device probing and change detection for enx-kebord
+
+Probing reads kernel state directly instead of forking pactl/aplay:
+- /proc/asound/cards, /proc/asound/card*/usbid (USB headsets/DACs) and
+  card*/pcm*p (only cards with a playback PCM are outputs: a webcam mic
+  or a USB MIDI interface is not headphones)
+- /sys/class/sound/card*/device (bus the card hangs off)
+- headphone jack switches of the sound card's input devices (evdev)
+- /sys/class/bluetooth connection links
+`pactl` is only asked when these can't answer (a Bluetooth link is up,
+or the jack switch is not readable). Every path is relative to a root
+directory so probes can run against captured fixture trees.
+
+DeviceStatusService caches the probe result and refreshes it in the
+background, so callers (daemon, GUI) never block on probing.
+
+Change detection waits for the system to report a change:
+- `pactl subscribe` sink/card/server events (PulseAudio/PipeWire: jack
+  plug, Bluetooth connect, default sink switch)
+- inotify on /dev/snd (ALSA card hotplug; procfs does not emit inotify
+  events, so /proc/asound cannot be watched directly)
+Polling is only used when neither source is available. While idle the
+monitor thread is blocked in select() and costs nothing. A `pactl` that
+exits right away (installed, but no audio server running) is restarted
+with exponential backoff and given up on after a few tries if inotify
+is there to fall back to.
+"""
+
+import ctypes
+import ctypes.util
+import fcntl
+import os
+import re
+import select
+import struct
+import subprocess
+import threading
+import time
+
+# inotify flags (from <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length (name follows)
+
+SND_DEVICE_DIR = '/dev/snd'
+DEFAULT_STATUS_TTL = 30.0  # seconds a cached probe result is trusted without a change event
+DEFAULT_DEBOUNCE = 0.2  # seconds; plugging a device fires a burst of events
+DEFAULT_POLL_INTERVAL = 5.0
+PACTL_RESTART_DELAY = 2.0
+PACTL_MAX_RESTART_DELAY = 300.0
+PACTL_QUICK_EXIT = 5.0  # seconds; a pactl exiting sooner found no audio server
+PACTL_MAX_QUICK_EXITS = 5  # then rely on inotify alone
+
+# evdev switch state ioctl and the jack switches that mean "headphones in"
+EVIOCGSW_LEN = 8
+EVIOCGSW = (2 << 30) | (EVIOCGSW_LEN << 16) | (ord('E') << 8) | 0x1b
+SW_HEADPHONE_INSERT = 0x02
+SW_JACK_PHYSICAL_INSERT = 0x07
+JACK_INPUT_NAMES = ('headphone', 'headset')
+CARD_NAME_INDICATORS = ('usb-audio', 'headphone', 'headset')
+
+# " 0 [PCH            ]: HDA-Intel - HDA Intel PCH"
+CARD_LINE = re.compile(r'^\s*(\d+)\s+\[(\S+)\s*\]:\s*(\S+)\s+-\s+(.*)$')
+PLAYBACK_PCM = re.compile(r'^pcm\d+p$')
+
+# pactl subscribe facilities that can change which output is in use
+RELEVANT_FACILITIES = ('sink', 'card', 'server')
+
+
+def parse_pactl_event(line):
+    """Return (event, facility) for a `pactl subscribe` line, or None"""
+    # Format: Event 'change' on sink #53
+    parts = line.strip().split()
+    if len(parts) < 4 or parts[0] != 'Event' or parts[2] != 'on':
+        return None
+    return parts[1].strip("'"), parts[3]
+
+
+def is_relevant_event(line):
+    """True if a pactl event can change the output device (not per-stream noise)"""
+    parsed = parse_pactl_event(line)
+    return parsed is not None and parsed[1] in RELEVANT_FACILITIES
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except (IOError, OSError, UnicodeDecodeError):
+        return None
+
+
+def _listdir(path):
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def read_switch_state(event_path):
+    """Bitmask of active evdev switches, or None if it can't be read
+
+    Fixture trees store the captured bitmask as the content of a regular
+    file in place of the device node.
+    """
+    try:
+        if os.path.isfile(event_path):
+            return int(_read(event_path).strip() or '0', 0)
+        fd = os.open(event_path, os.O_RDONLY | os.O_NONBLOCK)
+    except (OSError, ValueError, AttributeError):
+        return None
+    try:
+        buf = bytearray(EVIOCGSW_LEN)
+        fcntl.ioctl(fd, EVIOCGSW, buf, True)
+        return int.from_bytes(buf, 'little')
+    except OSError:
+        return None  # not an evdev node or no permission (input group)
+    finally:
+        os.close(fd)
+
+
+class AudioProbe:
+    """Direct procfs/sysfs audio probes, rooted so fixture trees can stand in for /"""
+
+    def __init__(self, root='/', allow_subprocess=True):
+        self.root = root
+        self.allow_subprocess = allow_subprocess
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def cards(self):
+        """Sound cards from /proc/asound/cards plus their bus (usb/pci/...) and playback support"""
+        content = _read(self.path('proc', 'asound', 'cards')) or ''
+        cards = []
+        for line in content.splitlines():
+            match = CARD_LINE.match(line)
+            if not match:
+                continue
+            number = int(match.group(1))
+            card = {
+                'number': number,
+                'id': match.group(2),
+                'driver': match.group(3),
+                'name': match.group(4).strip(),
+                'usb': os.path.exists(self.path('proc', 'asound', f'card{number}', 'usbid')),
+                'playback': any(PLAYBACK_PCM.match(entry)
+                                for entry in _listdir(self.path('proc', 'asound', f'card{number}'))),
+            }
+            try:
+                link = os.readlink(self.path('sys', 'class', 'sound', f'card{number}', 'device'))
+                card['usb'] = card['usb'] or '/usb' in link
+            except OSError:
+                pass
+            cards.append(card)
+        return cards
+
+    def jacks(self):
+        """Headphone jack switch devices: list of {'name', 'plugged'} (plugged None if unreadable)"""
+        jacks = []
+        input_dir = self.path('sys', 'class', 'input')
+        for entry in _listdir(input_dir):
+            if not entry.startswith('input'):
+                continue
+            name = (_read(os.path.join(input_dir, entry, 'name')) or '').strip()
+            if not any(word in name.lower() for word in JACK_INPUT_NAMES):
+                continue
+            plugged = None
+            for child in _listdir(os.path.join(input_dir, entry)):
+                if child.startswith('event'):
+                    state = read_switch_state(self.path('dev', 'input', child))
+                    if state is not None:
+                        plugged = bool(state & ((1 << SW_HEADPHONE_INSERT) |
+                                                (1 << SW_JACK_PHYSICAL_INSERT)))
+                    break
+            jacks.append({'name': name, 'plugged': plugged})
+        return jacks
+
+    def bluetooth_links(self):
+        """Number of active Bluetooth connections (hciX:handle entries)"""
+        return sum(1 for entry in _listdir(self.path('sys', 'class', 'bluetooth')) if ':' in entry)
+
+    def pactl_sinks(self):
+        """(name, active port) of every PulseAudio/PipeWire sink, or None without pactl"""
+        if not self.allow_subprocess:
+            return None
+        try:
+            result = subprocess.run(['pactl', 'list', 'sinks'], capture_output=True, text=True, timeout=5)
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return None
+        if result.returncode != 0:
+            return None
+        sinks = []
+        for line in result.stdout.splitlines():
+            line = line.strip()
+            if line.startswith('Name:'):
+                sinks.append([line[5:].strip(), ''])
+            elif line.startswith('Active Port:') and sinks:
+                sinks[-1][1] = line[12:].strip()
+        return [tuple(sink) for sink in sinks]
+
+    def probe(self):
+        """Decide whether headphones are in use; returns {'headphones', 'reason', 'method'}"""
+        cards = self.cards()
+        for card in cards:
+            if not card['playback']:
+                continue  # capture/MIDI-only (webcam mic, USB MIDI interface)
+            if card['usb']:
+                return {'headphones': True, 'reason': f"USB audio card: {card['name']}", 'method': 'procfs'}
+            label = f"{card['driver']} {card['name']}".lower()
+            if any(word in label for word in CARD_NAME_INDICATORS):
+                return {'headphones': True, 'reason': f"Headset card: {card['name']}", 'method': 'procfs'}
+
+        unknown_jack = False
+        for jack in self.jacks():
+            if jack['plugged']:
+                return {'headphones': True, 'reason': f"Jack plugged: {jack['name']}", 'method': 'evdev'}
+            unknown_jack = unknown_jack or jack['plugged'] is None
+
+        bluetooth = self.bluetooth_links() > 0
+        if bluetooth or unknown_jack or not cards:
+            # Direct reads can't tell whether the link is audio or the jack is
+            # in (or there is no ALSA state to read at all)
+            sinks = self.pactl_sinks()
+            if sinks:
+                for name, port in sinks:
+                    if name.startswith('bluez_'):
+                        return {'headphones': True, 'reason': f"Bluetooth sink: {name}", 'method': 'pactl'}
+                    if 'headphone' in port.lower() or 'headset' in port.lower():
+                        return {'headphones': True, 'reason': f"Active port: {port}", 'method': 'pactl'}
+                return {'headphones': False, 'reason': 'No headphone sink', 'method': 'pactl'}
+
+        return {'headphones': False, 'reason': 'No headphone device found', 'method': 'procfs'}
+
+    def detect_headphones(self):
+        return self.probe()['headphones']
+
+
+class DeviceStatusService:
+    """Cached headphone detection: one probe per change, answers never block"""
+
+    def __init__(self, probe=None, ttl=DEFAULT_STATUS_TTL):
+        self.probe = probe or AudioProbe()
+        self.ttl = ttl
+        self.probes = 0
+        self._lock = threading.Lock()
+        self._result = None
+        self._probed_at = 0.0
+        self._probing = False
+        self._again = False     # a change arrived while a probe was running
+        self._waiters = []      # one-shot callbacks for the next result
+        self._subscribers = []  # called on every result that differs from the last
+
+    def _fresh(self):
+        return self._result is not None and time.monotonic() - self._probed_at <= self.ttl
+
+    def get(self):
+        """Cached result (None before the first probe); a stale one triggers a background refresh"""
+        with self._lock:
+            result, fresh = self._result, self._fresh()
+        if not fresh:
+            self.refresh_async()
+        return result
+
+    def request(self, callback):
+        """Call callback(result) now if the cache is fresh, else once the refresh finishes"""
+        with self._lock:
+            if self._fresh():
+                result = self._result
+            else:
+                self._waiters.append(callback)
+                result = None
+        if result is not None:
+            callback(result)
+        else:
+            self.refresh_async()
+
+    def subscribe(self, callback):
+        """Call callback(result) whenever the detected device changes"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def snapshot(self):
+        """Cached result plus its age, for status reports"""
+        with self._lock:
+            if self._result is None:
+                return None
+            snapshot = dict(self._result)
+            snapshot['age_s'] = round(time.monotonic() - self._probed_at, 1)
+            return snapshot
+
+    def refresh_async(self):
+        """Probe on a background thread unless a probe is already running"""
+        with self._lock:
+            if self._probing:
+                self._again = True
+                return
+            self._probing = True
+        threading.Thread(target=self._probe, daemon=True).start()
+
+    def refresh(self):
+        """Probe in the calling thread (the device monitor's); returns the new result"""
+        with self._lock:
+            if self._probing:
+                self._again = True  # the running probe will go round once more
+                return self._result
+            self._probing = True
+        return self._probe()
+
+    def _probe(self):
+        while True:
+            try:
+                result = self.probe.probe()
+            except Exception as e:
+                result = {'headphones': False, 'reason': f"Probe failed: {e}", 'method': 'none'}
+            with self._lock:
+                changed = self._result is None or result['headphones'] != self._result['headphones']
+                self._result = result
+                self._probed_at = time.monotonic()
+                self.probes += 1
+                again, self._again = self._again, False
+                self._probing = again
+                waiters, self._waiters = self._waiters, []
+                subscribers = list(self._subscribers) if changed else []
+            for callback in waiters + subscribers:
+                try:
+                    callback(result)
+                except Exception:
+                    pass
+            if not again:
+                return result
+
+
+class InotifyWatch:
+    """Minimal ctypes inotify watch on one directory"""
+
+    def __init__(self, path, mask=IN_CREATE | IN_DELETE | IN_ATTRIB):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def drain(self):
+        """Discard pending events (we only care that something changed)"""
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def read_names(self):
+        """Names of the entries in pending events (consumes them; empty if none)"""
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except (BlockingIOError, OSError):
+                return names
+            if not data:
+                return names
+            offset = 0
+            while offset + INOTIFY_EVENT.size <= len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class DeviceChangeMonitor:
+    """Calls on_change() (debounced) whenever the audio output setup may have changed"""
+
+    def __init__(self, on_change, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.stop_flag = False
+        self.mode = None  # 'events' or 'polling', for status reporting
+        self.changes = 0
+        self._pactl = None
+        self._pactl_buffer = b''
+        self._pactl_retry_at = None
+        self._pactl_started_at = 0.0
+        self._pactl_quick_exits = 0
+        self._inotify = None
+        self._wake_read, self._wake_write = os.pipe()
+
+    def _start_pactl(self):
+        try:
+            self._pactl = subprocess.Popen(['pactl', 'subscribe'], stdout=subprocess.PIPE,
+                                           stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+            self._pactl_buffer = b''
+            self._pactl_retry_at = None
+            self._pactl_started_at = time.monotonic()
+        except (OSError, FileNotFoundError):
+            self._pactl = None
+
+    def _stop_pactl(self):
+        if self._pactl is not None:
+            try:
+                self._pactl.terminate()
+                self._pactl.wait(timeout=1)
+            except Exception:
+                pass
+            self._pactl = None
+
+    def _start_inotify(self):
+        try:
+            self._inotify = InotifyWatch(SND_DEVICE_DIR)
+        except (OSError, AttributeError):
+            self._inotify = None
+
+    def _read_pactl(self):
+        """Consume pactl output; returns True if a relevant event arrived"""
+        try:
+            data = os.read(self._pactl.stdout.fileno(), 4096)
+        except OSError:
+            data = b''
+        if not data:
+            now = time.monotonic()
+            quick = now - self._pactl_started_at < PACTL_QUICK_EXIT
+            self._stop_pactl()
+            if not quick:
+                # Ran, then exited: the audio server restarted; retry soon and re-probe
+                self._pactl_quick_exits = 0
+                self._pactl_retry_at = now + PACTL_RESTART_DELAY
+                return True
+            # Exited at once: no audio server. Back off, and stop trying
+            # altogether if inotify covers hotplug; nothing changed meanwhile
+            self._pactl_quick_exits += 1
+            if self._pactl_quick_exits >= PACTL_MAX_QUICK_EXITS and self._inotify is not None:
+                self._pactl_retry_at = None
+            else:
+                self._pactl_retry_at = now + min(PACTL_RESTART_DELAY * 2 ** self._pactl_quick_exits,
+                                                 PACTL_MAX_RESTART_DELAY)
+            return False
+        self._pactl_buffer += data
+        *lines, self._pactl_buffer = self._pactl_buffer.split(b'\n')
+        return any(is_relevant_event(line.decode('utf-8', 'replace')) for line in lines)
+
+    def _notify(self):
+        self.changes += 1
+        try:
+            self.on_change()
+        except Exception:
+            pass  # A failing probe must not kill the monitor
+
+    def run(self):
+        """Monitor until stop() is called (blocks the calling thread)"""
+        self._start_pactl()
+        self._start_inotify()
+        try:
+            if self._pactl is None and self._inotify is None:
+                self.mode = 'polling'
+                self._run_polling()
+            else:
+                self.mode = 'events'
+                self._run_events()
+        finally:
+            self._stop_pactl()
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def _run_polling(self):
+        # Last resort: no event source on this system
+        while not self.stop_flag:
+            ready, _, _ = select.select([self._wake_read], [], [], self.poll_interval)
+            if ready or self.stop_flag:
+                break
+            self._notify()
+
+    def _run_events(self):
+        pending_at = None
+        while not self.stop_flag:
+            now = time.monotonic()
+            timeouts = []
+            if pending_at is not None:
+                timeouts.append(max(0.0, pending_at - now))
+            if self._pactl_retry_at is not None:
+                timeouts.append(max(0.0, self._pactl_retry_at - now))
+            timeout = min(timeouts) if timeouts else None
+
+            fds = [self._wake_read]
+            if self._pactl is not None:
+                fds.append(self._pactl.stdout.fileno())
+            if self._inotify is not None:
+                fds.append(self._inotify.fd)
+            ready, _, _ = select.select(fds, [], [], timeout)
+
+            if self._wake_read in ready or self.stop_flag:
+                break
+            changed = False
+            if self._pactl is not None and self._pactl.stdout.fileno() in ready:
+                changed = self._read_pactl() or changed
+            if self._inotify is not None and self._inotify.fd in ready:
+                self._inotify.drain()
+                changed = True
+            if changed and pending_at is None:
+                pending_at = time.monotonic() + self.debounce
+
+            now = time.monotonic()
+            if self._pactl_retry_at is not None and now >= self._pactl_retry_at:
+                self._start_pactl()
+                if self._pactl is None:
+                    self._pactl_retry_at = now + PACTL_RESTART_DELAY * 5
+            if pending_at is not None and now >= pending_at:
+                pending_at = None
+                self._notify()
+
+    def stop(self):
+        """Wake the monitor thread and make run() return"""
+        self.stop_flag = True
+        try:
+            os.write(self._wake_write, b'\0')
+        except OSError:
+            pass
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Low-latency mixer engine for enx-kebord
+Features:
+- Pull-callback audio thread (SDL) instead of fire-and-forget Sound.play()
+- Active voices summed into a preallocated float32 buffer
+- Soft limiter so overlapping clicks never clip
+- Keypress-to-first-sample latency measurement
+- Pre-rendered randomized variant pools picked per keypress
+- Voice manager with a polyphony cap and voice stealing
+- Null output backend for headless benchmarking
+- Output format negotiated with the device (native rate and channels)
+"""
+
+import math
+import os
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+from latency_stats import LatencyRecorder, STAGE_VOICE_START, STAGE_SUBMIT
+
+# Engine defaults (overridable from the daemon config file)
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_CHANNELS = 2
+DEFAULT_BUFFER_FRAMES = 256
+DEFAULT_MAX_VOICES = 32
+STEAL_POLICIES = ('oldest', 'quietest', 'none')
+DEFAULT_VARIANTS = 8
+VARIANT_SEQUENCE = 4096  # length of the precomputed random pick order
+DEFAULT_LIMITER_RELEASE_MS = 100.0
+LIMITER_RELEASE_FLOOR = 1e-3  # gain reduction left once the release time has passed (-60 dB)
+
+
+def load_wav(path, target_rate=DEFAULT_SAMPLE_RATE):
+    """Load a PCM WAV file as mono float32 samples at target_rate"""
+    with wave.open(str(path), 'rb') as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    if sample_width == 2:
+        samples = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype=np.int32).astype(np.float32) / 2147483648.0
+    elif sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width * 8} bits")
+
+    # Downmix to mono; the engine duplicates voices across output channels
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return resample_linear(samples, rate, target_rate)
+
+
+def resample_linear(samples, source_rate, target_rate):
+    """Resample a mono float32 buffer with linear interpolation"""
+    if source_rate == target_rate or len(samples) == 0:
+        return np.ascontiguousarray(samples, dtype=np.float32)
+    length = int(round(len(samples) * target_rate / source_rate))
+    positions = np.arange(length, dtype=np.float64) * (source_rate / target_rate)
+    resampled = np.interp(positions, np.arange(len(samples)), samples)
+    return resampled.astype(np.float32)
+
+
+class VariantPool:
+    """Pre-rendered variants of one sound, picked per keypress without allocating"""
+
+    def __init__(self, variants, selection='random', seed=None):
+        self.variants = [np.ascontiguousarray(v, dtype=np.float32) for v in variants]
+        if not self.variants:
+            raise ValueError("VariantPool needs at least one variant")
+        self.selection = selection
+
+        # The pick order is computed up front so pick() is a list index
+        count = len(self.variants)
+        if selection == 'random' and count > 1:
+            rng = np.random.default_rng(seed)
+            # Random non-zero steps so the same variant never plays twice in a row
+            steps = rng.integers(1, count, size=VARIANT_SEQUENCE)
+            order = ((int(rng.integers(count)) + np.cumsum(steps)) % count).tolist()
+        else:
+            order = list(range(count))
+        self._order = [self.variants[i] for i in order]
+        self._cursor = 0
+
+    def __len__(self):
+        return len(self.variants)
+
+    def pick(self):
+        """Return the next variant (round-robin or precomputed random order)"""
+        cursor = self._cursor
+        self._cursor = cursor + 1 if cursor + 1 < len(self._order) else 0
+        return self._order[cursor]
+
+
+class Voice:
+    """One playing sample inside the mixer"""
+    __slots__ = ('samples', 'position', 'gain', 'trigger_time', 'active')
+
+    def __init__(self):
+        self.samples = None
+        self.position = 0
+        self.gain = 0.0
+        self.trigger_time = 0.0
+        self.active = False
+
+
+class VoiceManager:
+    """Fixed-polyphony voice allocation with a stealing policy"""
+
+    def __init__(self, polyphony=DEFAULT_MAX_VOICES, steal_policy='oldest'):
+        if steal_policy not in STEAL_POLICIES:
+            raise ValueError(f"Unknown steal policy: {steal_policy} (expected one of {STEAL_POLICIES})")
+        self.polyphony = polyphony
+        self.steal_policy = steal_policy
+        self.voices = [Voice() for _ in range(polyphony)]
+        # Stolen voices get one block of fade-out here instead of a hard cut
+        self.fading = [Voice() for _ in range(polyphony)]
+
+        self.voices_started = 0
+        self.voices_stolen = 0
+        self.voices_dropped = 0
+
+    def _steal_score(self, voice):
+        """Lower score = better victim"""
+        if self.steal_policy == 'quietest':
+            # Clicks decay monotonically, so gain times remaining fraction tracks loudness
+            return voice.gain * (len(voice.samples) - voice.position) / len(voice.samples)
+        return voice.trigger_time
+
+    def allocate(self, samples, gain, trigger_time):
+        """Start a voice, stealing one if the cap is reached; False if it was dropped"""
+        target = None
+        victim = None
+        victim_score = 0.0
+        for voice in self.voices:
+            if not voice.active:
+                target = voice
+                break
+            score = self._steal_score(voice)
+            if victim is None or score < victim_score:
+                victim, victim_score = voice, score
+
+        if target is None:
+            if self.steal_policy == 'none' or victim is None:
+                self.voices_dropped += 1
+                return False
+            self._fade_out(victim)
+            self.voices_stolen += 1
+            target = victim
+
+        target.samples = samples
+        target.position = 0
+        target.gain = gain
+        target.trigger_time = trigger_time
+        target.active = True
+        self.voices_started += 1
+        return True
+
+    def _fade_out(self, voice):
+        """Hand a stolen voice over to a fade slot (hard cut if none is free)"""
+        for slot in self.fading:
+            if not slot.active:
+                slot.samples = voice.samples
+                slot.position = voice.position
+                slot.gain = voice.gain
+                slot.trigger_time = voice.trigger_time
+                slot.active = True
+                return
+
+    def active_count(self):
+        """Number of voices currently sounding (excluding fade-outs)"""
+        return sum(1 for voice in self.voices if voice.active)
+
+    def stats(self):
+        """Voice allocation counters"""
+        return {
+            'polyphony': self.polyphony,
+            'steal_policy': self.steal_policy,
+            'active_voices': self.active_count(),
+            'voices_started': self.voices_started,
+            'voices_stolen': self.voices_stolen,
+            'voices_dropped': self.voices_dropped,
+        }
+
+
+class MixerEngine:
+    """Sums active voices into a preallocated buffer from the audio callback"""
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE, channels=DEFAULT_CHANNELS,
+                 buffer_frames=DEFAULT_BUFFER_FRAMES, max_voices=DEFAULT_MAX_VOICES,
+                 steal_policy='oldest', limiter_threshold=0.8,
+                 limiter_release_ms=DEFAULT_LIMITER_RELEASE_MS,
+                 latency=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.buffer_frames = buffer_frames
+        self.limiter_threshold = limiter_threshold
+        self.limiter_release_ms = limiter_release_ms
+        # Gain reduction decays exponentially, down to LIMITER_RELEASE_FLOOR
+        # after limiter_release_ms, whatever the block size or negotiated rate
+        self._release_per_second = -math.log(LIMITER_RELEASE_FLOOR) / (limiter_release_ms / 1000.0)
+
+        # Everything the callback touches is allocated up front
+        self._mix = np.zeros(buffer_frames, dtype=np.float32)
+        self._scratch = np.zeros(buffer_frames, dtype=np.float32)
+        self._ramp = np.linspace(0.0, 1.0, buffer_frames, endpoint=False, dtype=np.float32)
+        self._fade = 1.0 - self._ramp
+        self.voice_manager = VoiceManager(max_voices, steal_policy)
+        self._limiter_gain = 1.0
+
+        # Triggers cross threads through a deque (append/popleft are atomic);
+        # it is bounded by trigger(), which counts what doesn't fit as dropped
+        self._pending = deque()
+        self._pending_capacity = max_voices * 4
+        self.triggers_dropped = 0
+
+        # Origins of voices started since the last submit, for the submit stage
+        self.latency = latency if latency is not None else LatencyRecorder()
+        self._started = [0.0] * (max_voices * 4)
+        self._started_count = 0
+        self.events = 0
+        self.blocks_rendered = 0
+
+    @property
+    def output_latency(self):
+        """Time one output buffer takes to reach the device, in seconds"""
+        return self.buffer_frames / float(self.sample_rate)
+
+    def resize(self, buffer_frames):
+        """Reallocate the mix buffers (only called when the device is opened)"""
+        self.buffer_frames = buffer_frames
+        self._mix = np.zeros(buffer_frames, dtype=np.float32)
+        self._scratch = np.zeros(buffer_frames, dtype=np.float32)
+        self._ramp = np.linspace(0.0, 1.0, buffer_frames, endpoint=False, dtype=np.float32)
+        self._fade = 1.0 - self._ramp
+
+    @property
+    def voices_dropped(self):
+        """Triggers that never sounded (pending queue full, or polyphony cap with stealing disabled)"""
+        return self.voice_manager.voices_dropped + self.triggers_dropped
+
+    def trigger(self, samples, gain=1.0, timestamp=None):
+        """Queue a sample for playback; safe to call from any thread"""
+        if samples is None or gain <= 0.0:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        # Single producer (the audio worker), so the length check can't race another append
+        if len(self._pending) >= self._pending_capacity:
+            self.triggers_dropped += 1
+            return
+        self._pending.append((samples, gain, timestamp))
+
+    def active_voices(self):
+        """Number of voices currently sounding"""
+        return self.voice_manager.active_count()
+
+    def _start_pending(self, now):
+        """Hand queued triggers to the voice manager"""
+        pending = self._pending
+        allocate = self.voice_manager.allocate
+        latency = self.latency
+        while pending:
+            samples, gain, timestamp = pending.popleft()
+            if allocate(samples, gain, timestamp):
+                self.events += 1
+                if latency.enabled:
+                    latency.record(STAGE_VOICE_START, timestamp, now)
+                    if self._started_count < len(self._started):
+                        self._started[self._started_count] = timestamp
+                        self._started_count += 1
+
+    def _apply_limiter(self, mix, frames):
+        """Smoothed gain-reduction limiter followed by a hard safety clip"""
+        peak = float(np.max(np.abs(mix[:frames]))) if frames else 0.0
+        target = 1.0
+        if peak > self.limiter_threshold:
+            target = self.limiter_threshold / peak
+
+        start_gain = self._limiter_gain
+        if target < start_gain:
+            # Instant attack: the whole block gets the reduced gain
+            end_gain = target
+            mix[:frames] *= end_gain
+        else:
+            # Smooth release ramp back towards unity
+            reduction = (1.0 - start_gain) * math.exp(-frames * self._release_per_second / self.sample_rate)
+            if reduction < LIMITER_RELEASE_FLOOR:
+                reduction = 0.0
+            end_gain = min(target, 1.0 - reduction)
+            if start_gain != 1.0 or end_gain != 1.0:
+                gains = self._scratch[:frames]
+                np.multiply(self._ramp[:frames], end_gain - start_gain, out=gains)
+                gains += start_gain
+                mix[:frames] *= gains
+        self._limiter_gain = end_gain
+        np.clip(mix[:frames], -1.0, 1.0, out=mix[:frames])
+
+    def render(self, out):
+        """Fill an (frames, channels) float32 array with the next block of audio"""
+        total = out.shape[0]
+        offset = 0
+        while offset < total:
+            frames = min(self.buffer_frames, total - offset)
+            self._render_block(out[offset:offset + frames], frames)
+            offset += frames
+
+        # The buffer goes to the device when the callback returns
+        if self._started_count:
+            now = time.perf_counter()
+            for i in range(self._started_count):
+                self.latency.record(STAGE_SUBMIT, self._started[i], now)
+            self._started_count = 0
+
+    def _render_block(self, out, frames):
+        mix = self._mix
+        scratch = self._scratch
+        mix[:frames] = 0.0
+
+        self._start_pending(time.perf_counter())
+
+        for voice in self.voice_manager.voices:
+            if not voice.active:
+                continue
+            samples = voice.samples
+            position = voice.position
+            count = min(frames, len(samples) - position)
+            if count > 0:
+                np.multiply(samples[position:position + count], voice.gain, out=scratch[:count])
+                mix[:count] += scratch[:count]
+                voice.position = position + count
+            if voice.position >= len(samples):
+                voice.active = False
+                voice.samples = None
+
+        # Stolen voices ramp to silence over a single block
+        for voice in self.voice_manager.fading:
+            if not voice.active:
+                continue
+            samples = voice.samples
+            position = voice.position
+            count = min(frames, len(samples) - position)
+            if count > 0:
+                np.multiply(samples[position:position + count], voice.gain, out=scratch[:count])
+                scratch[:count] *= self._fade[:count]
+                mix[:count] += scratch[:count]
+            voice.active = False
+            voice.samples = None
+
+        self._apply_limiter(mix, frames)
+        out[:] = mix[:frames, None]
+        self.blocks_rendered += 1
+
+    def latency_stats(self):
+        """Voice counters plus keypress-to-first-sample latency in milliseconds"""
+        stats = {
+            'events': self.events,
+            'output_buffer_ms': self.output_latency * 1000.0,
+        }
+        stats.update(self.voice_manager.stats())
+        stats['triggers_dropped'] = self.triggers_dropped
+        stats['voices_dropped'] = self.voices_dropped
+        summary = self.latency.stage_summary(STAGE_VOICE_START)
+        if summary.get('count'):
+            stats.update({key: summary[key] for key in ('p50_ms', 'p99_ms', 'max_ms')})
+        return stats
+
+
+class SDLCallbackOutput:
+    """Opens an SDL playback device whose callback pulls from a MixerEngine"""
+
+    def __init__(self, engine, device_name=None, negotiate=True):
+        """negotiate: let the device keep its native rate/channels and adopt them
+        in the engine (sounds must be loaded after start())"""
+        self.engine = engine
+        self.device_name = device_name
+        self.negotiate = negotiate
+        self.device = None
+
+    def start(self):
+        """Open the device and start the callback thread"""
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', "hide")
+        from pygame._sdl2 import sdl2
+        from pygame._sdl2 import audio as sdl_audio
+
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+        device_name = self.device_name
+        if device_name is None:
+            names = sdl_audio.get_audio_device_names(False)
+            device_name = names[0] if names else ""
+
+        allowed_changes = 0
+        if self.negotiate:
+            allowed_changes = sdl_audio.AUDIO_ALLOW_FREQUENCY_CHANGE | sdl_audio.AUDIO_ALLOW_CHANNELS_CHANGE
+        self.device = sdl_audio.AudioDevice(
+            devicename=device_name,
+            iscapture=False,
+            frequency=self.engine.sample_rate,
+            audioformat=sdl_audio.AUDIO_F32,
+            numchannels=self.engine.channels,
+            chunksize=self.engine.buffer_frames,
+            allowed_changes=allowed_changes,
+            callback=self._callback,
+        )
+        # Mix in whatever the device runs at, so SDL never converts the stream
+        self.engine.sample_rate = self.device.frequency
+        self.engine.channels = self.device.numchannels
+        if self.device.chunksize != self.engine.buffer_frames:
+            self.engine.resize(self.device.chunksize)
+        self.device.pause(0)
+
+    def _callback(self, device, stream):
+        try:
+            out = np.asarray(stream).view(np.float32).reshape(-1, self.engine.channels)
+            self.engine.render(out)
+        except Exception:
+            pass  # Never let an exception escape into the SDL audio thread
+
+    def close(self):
+        """Stop the callback and release the device"""
+        if self.device is not None:
+            try:
+                self.device.pause(1)
+                self.device.close()
+            except Exception:
+                pass
+            self.device = None
+
+
+
+class NullOutput:
+    """Device-free output that pulls from a MixerEngine on a real-time clock
+
+    Stands in for SDLCallbackOutput in headless benchmarks. With
+    record_seconds > 0 the first seconds of rendered audio are kept in
+    self.recording for inspection.
+    """
+
+    def __init__(self, engine, record_seconds=0.0):
+        self.engine = engine
+        self.stop_flag = False
+        self.thread = None
+        self.underruns = 0
+        self._block = np.zeros((engine.buffer_frames, engine.channels), dtype=np.float32)
+        frames = int(record_seconds * engine.sample_rate)
+        self.recording = np.zeros((frames, engine.channels), dtype=np.float32)
+        self.recorded_frames = 0
+
+    def start(self):
+        """Start the simulated audio callback thread"""
+        self.stop_flag = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        period = self.engine.buffer_frames / float(self.engine.sample_rate)
+        deadline = time.perf_counter()
+        while not self.stop_flag:
+            self.engine.render(self._block)
+            self._record(self._block)
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Missed a device deadline; resynchronise like a real underrun
+                self.underruns += 1
+                deadline = time.perf_counter()
+
+    def _record(self, block):
+        space = len(self.recording) - self.recorded_frames
+        if space <= 0:
+            return
+        count = min(space, len(block))
+        self.recording[self.recorded_frames:self.recorded_frames + count] = block[:count]
+        self.recorded_frames += count
+
+    def close(self):
+        """Stop the clock thread"""
+        self.stop_flag = True
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
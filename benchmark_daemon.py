@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Headless latency/throughput benchmark for the enhanced daemon
+Drives KeyboardSoundDaemonEnhanced with synthetic key events through a
+null input source and a null (recording) audio sink - no X session or
+sound card needed - and reports per-stage latency, dropped events, CPU
+time and RSS as JSON so results can be compared between versions.
+
+Usage:
+  python3 benchmark_daemon.py --rates 10,100,500,1000,2000 --duration 5
+  python3 benchmark_daemon.py --output bench.json --baseline previous.json
+"""
+
+# Enforce venv: re-exec with local venv Python if not already using it
+import os, sys
+from pathlib import Path
+BASE = Path(__file__).resolve().parent
+VENV_PY = BASE / 'venv' / 'bin' / 'python3'
+if __name__ == "__main__" and VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+    os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from audio_engine import NullOutput
+from keyboard_sound_daemon_enhanced import KeyboardSoundDaemonEnhanced, SOUND_TYPES
+
+DEFAULT_RATES = [10, 100, 500, 1000, 2000]
+BENCH_KEYS = [chr(c) for c in range(ord('a'), ord('z') + 1)]
+
+
+class SyntheticInputSource:
+    """Replays key press/release pairs at a fixed rate from a producer thread"""
+
+    def __init__(self, rate, duration):
+        self.rate = rate
+        self.count = max(1, int(rate * duration))
+        self.events_sent = 0
+        self.done = threading.Event()
+        self.stop_flag = False
+        self.thread = None
+
+    def start(self, on_press, on_release):
+        """Start producing events like the pynput listener thread would"""
+        self.thread = threading.Thread(target=self._run, args=(on_press, on_release), daemon=True)
+        self.thread.start()
+
+    def _run(self, on_press, on_release):
+        interval = 1.0 / self.rate
+        start = time.perf_counter()
+        for i in range(self.count):
+            if self.stop_flag:
+                break
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            key = BENCH_KEYS[i % len(BENCH_KEYS)]
+            on_press(key)
+            on_release(key)
+            self.events_sent += 2
+        self.done.set()
+
+    def stop(self):
+        self.stop_flag = True
+
+
+def current_rss_kb():
+    """Resident set size of this process in KiB"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (IOError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_version():
+    """Commit the benchmark ran against, for comparing results between versions"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=str(BASE),
+                                capture_output=True, text=True, timeout=5)
+        if result.returncode == 0:
+            return result.stdout.strip()
+    except (subprocess.SubprocessError, FileNotFoundError):
+        pass
+    return 'unknown'
+
+
+def run_rate(rate, duration, config, drain_seconds=0.2):
+    """Benchmark one input rate with a fresh daemon; returns a result dict"""
+    source = SyntheticInputSource(rate, duration)
+    # The daemon is chatty; keep the JSON output clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        daemon = KeyboardSoundDaemonEnhanced(config=config, audio_output=NullOutput,
+                                             input_source=source, write_pid=False,
+                                             single_instance=False)
+        rss_before = current_rss_kb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        runner = threading.Thread(target=daemon.run, daemon=True)
+        runner.start()
+        source.done.wait(duration * 2 + 5)
+        time.sleep(drain_seconds)  # let queued events reach the sink
+
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+        report = daemon.latency_report()
+        underruns = daemon.audio_output.underruns if daemon.audio_output else 0
+        rss_after = current_rss_kb()
+
+        daemon.request_stop()
+        runner.join(timeout=2.0)
+
+    engine = report['engine']
+    return {
+        'rate': rate,
+        'duration_s': round(wall_seconds, 3),
+        'events_sent': source.events_sent,
+        'events_played': engine['events'],
+        'dropped': {
+            'queue_overflows': report['input']['queue_overflows'],
+            'coalesced': report['input']['events_coalesced'],
+            'voices_dropped': engine['voices_dropped'],
+            'voices_stolen': engine['voices_stolen'],
+            'output_underruns': underruns,
+        },
+        'latency_ms': {stage: data['latency'] for stage, data in report['stages'].items()},
+        'jitter_ms': {stage: data['jitter'] for stage, data in report['stages'].items()},
+        'output_buffer_ms': engine['output_buffer_ms'],
+        'cpu_seconds': round(cpu_seconds, 4),
+        'cpu_percent': round(100.0 * cpu_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+        'rss_kb': rss_after,
+        'rss_growth_kb': rss_after - rss_before,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List regressions of submit p99 latency and CPU against a baseline run"""
+    previous = {entry['rate']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry['rate'])
+        if not old:
+            continue
+        checks = [
+            ('submit_p99_ms', entry['latency_ms']['submit'].get('p99_ms'),
+             old['latency_ms']['submit'].get('p99_ms'), 0.5),
+            ('cpu_percent', entry['cpu_percent'], old['cpu_percent'], 1.0),
+        ]
+        for name, new_value, old_value, slack in checks:
+            if new_value is None or old_value is None:
+                continue
+            if new_value > old_value * (1.0 + tolerance) + slack:
+                regressions.append({'rate': entry['rate'], 'metric': name,
+                                    'baseline': old_value, 'current': new_value})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless enx-kebord daemon benchmark')
+    parser.add_argument('--rates', type=str, default=','.join(str(r) for r in DEFAULT_RATES),
+                        help='Comma-separated key rates in keys/second')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per rate')
+    parser.add_argument('--sound', choices=SOUND_TYPES, default='blue', help='Sound profile to play')
+    parser.add_argument('--variants', type=int, default=8, help='Variants per sound type')
+    parser.add_argument('--max-voices', type=int, default=32, help='Polyphony cap')
+    parser.add_argument('--output', type=str, help='Write JSON results to this file')
+    parser.add_argument('--baseline', type=str, help='Previous JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression against the baseline')
+    args = parser.parse_args()
+
+    config = {
+        'device_monitor': False,
+        'control_socket': False,
+        'notifications': False,
+        'fast_start': False,
+        'volume': 1.0,
+        'current_sound_type': args.sound,
+        'variants': args.variants,
+        'max_voices': args.max_voices,
+        'latency_recording': True,
+    }
+    rates = [int(rate) for rate in args.rates.split(',') if rate.strip()]
+
+    results = []
+    for rate in rates:
+        print(f"Benchmarking {rate} keys/s for {args.duration}s...", file=sys.stderr)
+        results.append(run_rate(rate, args.duration, config))
+
+    output = {
+        'benchmark': 'enx-kebord-daemon',
+        'version': git_version(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'config': config,
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        output['regressions'] = regressions
+        if regressions:
+            exit_code = 1
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
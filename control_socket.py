@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Control socket for enx-kebord
+The daemon listens on a Unix-domain socket; clients (GUI, scripts) send
+one JSON object per line and get one JSON reply per line:
+
+  -> {"command": "set-sound", "args": {"sound": "thock"}}
+  <- {"ok": true, "sound": "thock"}
+
+A client that sends {"command": "subscribe"} keeps its connection open
+and receives {"event": "status", ...} lines: the current state first,
+then one line per change, and {"event": "stopped"} when the daemon exits.
+Lines are only pushed when the daemon reports a change (sound, volume,
+device, worker health); free-running counters such as key events are
+left out of them, since typing would otherwise mean a push every few
+seconds. Clients that want counters ask with {"command": "status"}.
+
+Each connection is served on its own thread, so a client that connects
+and goes quiet never holds up anyone else's commands.
+"""
+
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+
+SOCKET_PATH = Path.home() / ".keyboard_sound_daemon.sock"
+CLIENT_TIMEOUT = 2.0
+
+
+class ControlError(Exception):
+    """Raised by command handlers for invalid requests, and by clients on failure"""
+
+
+def require(args, name):
+    """A command argument; raises ControlError if the request lacks it"""
+    if name not in args:
+        raise ControlError(f"missing argument: {name}")
+    return args[name]
+
+
+class ControlServer:
+    """Serves JSON-line commands on a Unix-domain socket, one thread per connection"""
+
+    def __init__(self, handlers, path=SOCKET_PATH, publisher=None):
+        self.handlers = handlers  # command name -> callable(args dict) -> dict
+        self.path = Path(path)
+        self.publisher = publisher  # StatusPublisher serving "subscribe"
+        self.sock = None
+        self.thread = None
+        self.stop_flag = False
+
+    def start(self):
+        """Bind the socket (replacing a stale one) and start serving"""
+        if self.path.exists():
+            if is_listening(self.path):
+                raise ControlError(f"Another daemon is already listening on {self.path}")
+            self.path.unlink()
+
+        # Bind under a temporary name and rename once listening, so the socket
+        # appears (for clients watching the directory) only when it accepts
+        staging = self.path.with_name(self.path.name + '.new')
+        if staging.exists():
+            staging.unlink()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(staging))
+        os.chmod(str(staging), 0o600)
+        self.sock.listen(8)
+        os.rename(str(staging), str(self.path))
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while not self.stop_flag:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                break  # socket closed by stop()
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        kept = False
+        try:
+            kept = self._handle_connection(conn)
+        except Exception:
+            pass  # client timed out or went away
+        finally:
+            if not kept:
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+
+    def _handle_connection(self, conn):
+        """Serve request lines; True if the connection became a subscription"""
+        conn.settimeout(CLIENT_TIMEOUT)
+        reader = conn.makefile('r', encoding='utf-8')
+        writer = conn.makefile('w', encoding='utf-8')
+        for line in reader:
+            if not line.strip():
+                continue
+            if self.publisher is not None and is_subscribe(line):
+                self.publisher.subscribe(conn)
+                return True
+            reply = self.dispatch(line)
+            writer.write(json.dumps(reply) + '\n')
+            writer.flush()
+        return False
+
+    def dispatch(self, line):
+        """Run one JSON request line and build the reply"""
+        try:
+            request = json.loads(line)
+            command = request.get('command')
+            handler = self.handlers.get(command)
+            if handler is None:
+                raise ControlError(f"Unknown command: {command}")
+            result = handler(request.get('args') or {})
+            reply = {'ok': True}
+            reply.update(result or {})
+            return reply
+        except (ControlError, ValueError, TypeError) as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            return {'ok': False, 'error': f"Internal error: {e}"}
+
+    def stop(self):
+        """Stop serving and remove the socket file"""
+        self.stop_flag = True
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        try:
+            if self.path.exists():
+                self.path.unlink()
+        except OSError:
+            pass
+
+
+class StatusPublisher:
+    """Pushes status snapshots to subscribed clients when they change"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot  # callable -> dict of the published state
+        self.subscribers = []
+        self.published = 0
+        self._new = []     # subscribers still waiting for their first snapshot
+        self._last = None
+        self._dirty = False
+        self._stop = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def subscribe(self, conn):
+        """Take over a client connection; it gets the current state right away"""
+        conn.settimeout(CLIENT_TIMEOUT)  # bounds sends to a client that stopped reading
+        with self._condition:
+            self._new.append(conn)
+            self._condition.notify()
+
+    def changed(self):
+        """Mark the state as changed; never blocks on clients"""
+        with self._condition:
+            self._dirty = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # Sleeps until changed(), a new subscriber or stop(): nothing is re-checked on a timer
+                self._condition.wait_for(lambda: self._dirty or self._new or self._stop)
+                if self._stop:
+                    break
+                new, self._new = self._new, []
+                self._dirty = False
+                if not self.subscribers and not new:
+                    continue
+            try:
+                state = self.snapshot()
+            except Exception:
+                continue
+            event = dict(state, event='status')
+            if state != self._last:
+                self._last = state
+                self.published += 1
+                self.subscribers = self._send(self.subscribers, event)
+            self.subscribers += self._send(new, event)
+        self._send(self.subscribers + self._new, {'event': 'stopped'}, close=True)
+        self.subscribers = []
+
+    def _send(self, connections, event, close=False):
+        """Write one event line to each connection; returns those still open"""
+        line = (json.dumps(event) + '\n').encode('utf-8')
+        alive = []
+        for conn in connections:
+            try:
+                conn.sendall(line)
+            except OSError:
+                self._close(conn)  # gone, or not reading: drop it
+                continue
+            if close:
+                self._close(conn)
+            else:
+                alive.append(conn)
+        return alive
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def stop(self):
+        """Tell subscribers the daemon is stopping and close their connections"""
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(CLIENT_TIMEOUT)
+
+
+def is_subscribe(line):
+    try:
+        return json.loads(line).get('command') == 'subscribe'
+    except (ValueError, AttributeError):
+        return False
+
+
+def is_listening(path=SOCKET_PATH):
+    """True if a daemon accepts connections on the socket"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(0.5)
+        probe.connect(str(path))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def send_command(command, path=SOCKET_PATH, timeout=CLIENT_TIMEOUT, **args):
+    """Send one command to the daemon and return its reply dict
+
+    Raises ControlError if the daemon is not reachable or rejects the command.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            request = json.dumps({'command': command, 'args': args}) + '\n'
+            sock.sendall(request.encode('utf-8'))
+            with sock.makefile('r', encoding='utf-8') as reader:
+                line = reader.readline()
+    except OSError as e:
+        raise ControlError(f"Daemon not reachable: {e}")
+    if not line:
+        raise ControlError("Daemon closed the connection")
+    reply = json.loads(line)
+    if not reply.get('ok'):
+        raise ControlError(reply.get('error', 'Command failed'))
+    return reply
+
+
+def subscribe(path=SOCKET_PATH, timeout=CLIENT_TIMEOUT):
+    """Yield the daemon's status events as dicts until it stops or disconnects
+
+    Raises ControlError if the daemon is not reachable.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall((json.dumps({'command': 'subscribe'}) + '\n').encode('utf-8'))
+        sock.settimeout(None)  # events arrive only when something changes
+    except OSError as e:
+        sock.close()
+        raise ControlError(f"Daemon not reachable: {e}")
+    with sock, sock.makefile('r', encoding='utf-8') as reader:
+        try:
+            for line in reader:
+                event = json.loads(line)
+                yield event
+                if event.get('event') == 'stopped':
+                    return
+        except (OSError, ValueError):
+            return
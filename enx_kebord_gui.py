@@ -19,18 +19,30 @@ import json
 import os
 import threading
 import time
+import select
 from pathlib import Path
 
 # Suppress pygame messages
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import pygame
 
+from control_socket import send_command, subscribe, ControlError, SOCKET_PATH
+from audio_devices import DeviceStatusService, InotifyWatch, IN_CREATE, IN_MOVED_TO
+from instance_lock import holder_pid
+from sound_format import open_mixer, mixer_sound
+
 # Configuration
 CONFIG_FILE = Path.home() / ".enx_kebord_config.json"
+DAEMON_CONFIG_FILE = Path.home() / ".keyboard_sound_config.json"
 DAEMON_SCRIPT = Path(__file__).parent / "keyboard_sound_control.sh"
 SOUND_DIR = Path(__file__).parent / "generated_sounds"
 CURRENT_SOUND_FILE = Path(__file__).parent / "key_press.wav"
 
+# Cached headphone detection used when the daemon is not running
+DEVICE_STATUS = DeviceStatusService()
+# Fallback re-check while the daemon is down, when inotify is unavailable
+RECONNECT_INTERVAL = 5.0
+
 # Available sound types
 SOUND_TYPES = [
     ('Blue (Cherry MX)', 'blue'),
@@ -54,10 +66,12 @@ SOUND_TYPES = [
 class EnxKebordGUI:
     def __init__(self, root):
         self.root = root
+        self.preview_sounds = {}  # sound key -> pygame Sound, loaded once per session
         self.setup_window()
         self.load_config()
         self.create_widgets()
         self.update_status()
+        self.refresh_audio_info()
         self.start_status_monitor()
         
     def setup_window(self):
@@ -109,6 +123,31 @@ class EnxKebordGUI:
         except Exception:
             pass
     
+    def save_daemon_sound(self, sound_key):
+        """Record the selected sound in the daemon config so it renders matching variants
+
+        A running daemon owns its config file: the change goes through it
+        (set-sound), and it persists the file itself. Only when no daemon
+        runs is the file updated here, atomically.
+        """
+        try:
+            send_command('set-sound', sound=sound_key)
+            return
+        except ControlError:
+            pass
+        try:
+            daemon_config = {}
+            if DAEMON_CONFIG_FILE.exists():
+                with open(DAEMON_CONFIG_FILE, 'r') as f:
+                    daemon_config = json.load(f)
+            daemon_config['current_sound_type'] = sound_key
+            temporary = DAEMON_CONFIG_FILE.with_name(f".{DAEMON_CONFIG_FILE.name}.{os.getpid()}")
+            with open(temporary, 'w') as f:
+                json.dump(daemon_config, f, indent=2)
+            os.replace(str(temporary), str(DAEMON_CONFIG_FILE))
+        except Exception:
+            pass
+    
     def create_widgets(self):
         """Create all GUI widgets"""
         # Main container
@@ -329,8 +368,11 @@ class EnxKebordGUI:
         
     def apply_volume(self):
         """Apply volume to the daemon"""
-        # This will be implemented to communicate with the daemon
         self.save_config()
+        try:
+            send_command('set-volume', volume=self.config['volume'])
+        except ControlError:
+            pass  # Daemon not running; it picks the volume up from its config on start
         
     def on_sound_change(self, event=None):
         """Handle sound selection change"""
@@ -367,11 +409,12 @@ class EnxKebordGUI:
                 
             try:
                 # Initialize pygame mixer if not already done
-                if not pygame.mixer.get_init():
-                    pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+                open_mixer()
                 
-                # Load and play sound
-                sound = pygame.mixer.Sound(str(sound_file))
+                # Load once (from the cache, already in the mixer's format) and play
+                sound = self.preview_sounds.get(sound_key)
+                if sound is None:
+                    sound = self.preview_sounds[sound_key] = mixer_sound(sound_file)
                 sound.set_volume(self.config.get('volume', 0.7))
                 sound.play()
                 
@@ -414,6 +457,16 @@ class EnxKebordGUI:
                 messagebox.showerror("Error", f"Sound file not found: {sound_file}\nPlease regenerate sounds or check installation")
                 return
             
+            # A running daemon switches in-process: no file copy, no restart
+            try:
+                send_command('set-sound', sound=sound_key)
+                self.config['current_sound'] = sound_key
+                self.save_config()
+                self.current_sound_var.set(f"Applied: {selected_name}")
+                return
+            except ControlError:
+                pass  # Daemon not reachable: update the files for its next start
+            
             # Check if we can write to the target file
             if not CURRENT_SOUND_FILE.parent.exists():
                 messagebox.showerror("Error", f"Target directory doesn't exist: {CURRENT_SOUND_FILE.parent}")
@@ -438,6 +491,7 @@ class EnxKebordGUI:
             # Update config
             self.config['current_sound'] = sound_key
             self.save_config()
+            self.save_daemon_sound(sound_key)
             
             # Update the dropdown to show the selected sound
             self.sound_var.set(selected_name)
@@ -476,32 +530,29 @@ class EnxKebordGUI:
             print(f"Apply sound error: {error_details}")  # Also print to console for debugging
             
     def refresh_audio_info(self):
-        """Refresh audio device information"""
+        """Refresh audio device information without blocking the window"""
+        self.audio_device_var.set("Detecting...")
+        threading.Thread(target=self.query_audio_device, daemon=True).start()
+
+    def query_audio_device(self):
+        """Background thread: ask the daemon's cached detection, else probe locally"""
         try:
-            # Import the AudioDeviceDetector from the daemon
-            import sys
-            sys.path.append(str(Path(__file__).parent))
-            from keyboard_sound_daemon_enhanced import AudioDeviceDetector
-            
-            headphones_detected = AudioDeviceDetector.detect_headphones()
-            volume_multiplier = AudioDeviceDetector.get_volume_multiplier()
-            
-            if headphones_detected:
-                self.audio_device_var.set(f"🎧 Headphones detected - Volume: {int(volume_multiplier*100)}%")
-            else:
-                self.audio_device_var.set(f"🔊 Speakers detected - Volume: {int(volume_multiplier*100)}%")
-                
-        except Exception as e:
-            # Fallback method
-            try:
-                result = subprocess.run(["pactl", "info"], capture_output=True, text=True)
-                if "PulseAudio" in result.stdout or "PipeWire" in result.stdout:
-                    self.audio_device_var.set("🔊 Audio system detected")
-                else:
-                    self.audio_device_var.set("🔊 Audio system available")
-            except:
-                self.audio_device_var.set(f"Audio info unavailable")
-            
+            reply = send_command('status')
+            if reply.get('device'):
+                self.root.after(0, self.show_audio_info, reply['device'], reply.get('effective_volume'))
+                return
+        except ControlError:
+            pass
+        # Daemon not running: the local service probes once and calls back
+        DEVICE_STATUS.request(lambda result: self.root.after(0, self.show_audio_info, result))
+
+    def show_audio_info(self, result, effective_volume=None):
+        """Display a detection result and the daemon's effective volume, if running (Tk thread)"""
+        label = "🎧 Headphones detected" if result['headphones'] else "🔊 Speakers detected"
+        if effective_volume is not None:
+            label += f" - Volume: {effective_volume * 100:.0f}%"
+        self.audio_device_var.set(label)
+
     def start_daemon(self):
         """Start the keyboard sound daemon"""
         try:
@@ -590,21 +641,37 @@ class EnxKebordGUI:
     def update_status(self):
         """Update daemon status display"""
         try:
-            result = subprocess.run([str(DAEMON_SCRIPT), "status"], capture_output=True, text=True)
-            if "running" in result.stdout.lower():
-                self.status_var.set("✅ Daemon is running")
-                self.config['daemon_running'] = True
-                self.start_button.configure(state='disabled')
-                self.stop_button.configure(state='normal')
-            else:
-                self.status_var.set("❌ Daemon is not running")
-                self.config['daemon_running'] = False
-                self.start_button.configure(state='normal')
-                self.stop_button.configure(state='disabled')
+            # The daemon holds the instance lock for as long as it runs
+            self.show_running(bool(holder_pid()))
         except Exception:
             self.status_var.set("❓ Unable to check daemon status")
             
         self.update_current_sound_display()
+
+    def show_running(self, running, healthy=True):
+        """Reflect the daemon state in the status line and buttons (Tk thread)"""
+        if running:
+            self.status_var.set("✅ Daemon is running" if healthy else "⚠️ Daemon is running (degraded)")
+            self.config['daemon_running'] = True
+            self.start_button.configure(state='disabled')
+            self.stop_button.configure(state='normal')
+        else:
+            self.status_var.set("❌ Daemon is not running")
+            self.config['daemon_running'] = False
+            self.start_button.configure(state='normal')
+            self.stop_button.configure(state='disabled')
+
+    def show_daemon_status(self, event):
+        """Apply a status event pushed by the daemon; None means it is gone (Tk thread)"""
+        if event is None or event.get('event') == 'stopped':
+            self.show_running(False)
+            return
+        self.show_running(True, event.get('healthy', True))
+        if event.get('sound') and event['sound'] != self.config['current_sound']:
+            self.config['current_sound'] = event['sound']
+            self.update_current_sound_display()
+        if event.get('device'):
+            self.show_audio_info(event['device'], event.get('effective_volume'))
         
     def update_current_sound_display(self):
         """Update current sound display"""
@@ -616,20 +683,40 @@ class EnxKebordGUI:
                 
     def start_status_monitor(self):
         """Start background status monitoring"""
-        def monitor():
-            while True:
-                time.sleep(5)  # Update every 5 seconds
-                self.root.after(0, self.update_status)
-                
-        monitor_thread = threading.Thread(target=monitor, daemon=True)
-        monitor_thread.start()
+        threading.Thread(target=self.follow_daemon_status, daemon=True).start()
+
+    def follow_daemon_status(self):
+        """Background thread: apply the daemon's pushed status events
+
+        While the daemon runs this blocks on its subscription stream; while
+        it is down it sleeps until the control socket appears (inotify on its
+        directory, ignoring every other file there), so nothing is polled or
+        forked either way.
+        """
+        try:
+            watch = InotifyWatch(SOCKET_PATH.parent, IN_CREATE | IN_MOVED_TO)
+        except OSError:
+            watch = None
+        while True:
+            if watch:
+                watch.drain()  # before connecting, so a socket created meanwhile still wakes us
+            try:
+                for event in subscribe():
+                    self.root.after(0, self.show_daemon_status, event)
+            except ControlError:
+                pass
+            self.root.after(0, self.show_daemon_status, None)
+            if watch:
+                while SOCKET_PATH.name not in watch.read_names():
+                    select.select([watch.fd], [], [])
+            else:
+                time.sleep(RECONNECT_INTERVAL)
 
 def main():
     """Main application entry point"""
-    # Initialize pygame for sound testing with optimized settings
+    # Initialize pygame for sound testing in the device's native format
     try:
-        pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
-        pygame.mixer.init()
+        open_mixer()
     except Exception:
         pass  # Continue without sound preview if pygame fails
     
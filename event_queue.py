@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Input event queue for enx-kebord
+Bounded single-producer/single-consumer ring buffer between the pynput
+listener thread (producer) and the daemon's audio worker (consumer).
+The producer never blocks: a full queue drops the event and counts it.
+"""
+
+import os
+import select
+
+# Event kinds
+KEY_PRESS = 0
+KEY_RELEASE = 1
+INPUT_RESET = 2  # the listener restarted: forget held keys
+
+DEFAULT_QUEUE_CAPACITY = 1024
+
+
+class EventQueue:
+    """Bounded SPSC ring buffer of (kind, key, timestamp) events"""
+
+    def __init__(self, capacity=DEFAULT_QUEUE_CAPACITY):
+        # Power-of-two capacity so positions wrap with a mask
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._slots = [None] * size
+        self._head = 0  # next slot to read (consumer only)
+        self._tail = 0  # next slot to write (producer only)
+        self._sleeping = False
+        self.overflows = 0
+
+        # Self-pipe so the consumer can sleep without polling
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def push(self, kind, key, timestamp):
+        """Producer side: store an event; returns False if the queue was full"""
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            self.overflows += 1
+            return False
+        self._slots[tail & self._mask] = (kind, key, timestamp)
+        # Publishing the new tail makes the slot visible to the consumer
+        self._tail = tail + 1
+        if self._sleeping:
+            self.wake()
+        return True
+
+    def pop(self):
+        """Consumer side: next event or None if the queue is empty"""
+        head = self._head
+        if head == self._tail:
+            return None
+        index = head & self._mask
+        event = self._slots[index]
+        self._slots[index] = None
+        self._head = head + 1
+        return event
+
+    def wait(self, timeout=None):
+        """Consumer side: block until an event is queued or wake() is called"""
+        self._sleeping = True
+        try:
+            # Re-check after announcing we sleep so a concurrent push is never missed
+            if self._head != self._tail:
+                return True
+            ready, _, _ = select.select([self._read_fd], [], [], timeout)
+            if ready:
+                try:
+                    os.read(self._read_fd, 4096)
+                except BlockingIOError:
+                    pass
+            return self._head != self._tail
+        finally:
+            self._sleeping = False
+
+    def wake(self):
+        """Interrupt a blocked wait() (used for new events and for shutdown)"""
+        try:
+            os.write(self._write_fd, b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Pipe already full means a wakeup is already pending
+
+    def close(self):
+        """Release the wakeup pipe"""
+        for fd in (self._read_fd, self._write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Hotkey dispatcher for enx-kebord
+Bindings like "ctrl+shift+s" are compiled once into a table keyed by
+(modifier bitmask, key name), so each key event costs one dict lookup
+no matter how many bindings exist. Only modifiers are tracked between
+events; pynput Key/KeyCode objects (and plain strings) are normalised
+to names first, so the control character Ctrl+S produces or a shifted
+'S' still match "s".
+"""
+
+# Modifier bits
+MOD_SHIFT = 1
+MOD_CTRL = 2
+MOD_ALT = 4
+MOD_SUPER = 8
+
+MODIFIER_NAMES = {
+    'shift': MOD_SHIFT,
+    'ctrl': MOD_CTRL, 'control': MOD_CTRL,
+    'alt': MOD_ALT,
+    'super': MOD_SUPER, 'cmd': MOD_SUPER, 'win': MOD_SUPER, 'meta': MOD_SUPER,
+}
+
+# pynput Key names of modifier keys (either side) -> modifier bit
+MODIFIER_KEYS = {
+    'shift': MOD_SHIFT, 'shift_l': MOD_SHIFT, 'shift_r': MOD_SHIFT,
+    'ctrl': MOD_CTRL, 'ctrl_l': MOD_CTRL, 'ctrl_r': MOD_CTRL,
+    'alt': MOD_ALT, 'alt_l': MOD_ALT, 'alt_r': MOD_ALT,
+    'cmd': MOD_SUPER, 'cmd_l': MOD_SUPER, 'cmd_r': MOD_SUPER,
+}
+
+# Display order when describing a binding
+MODIFIER_ORDER = ((MOD_CTRL, 'Ctrl'), (MOD_ALT, 'Alt'), (MOD_SUPER, 'Super'), (MOD_SHIFT, 'Shift'))
+KEY_LABELS = {'up': '↑', 'down': '↓', 'left': '←', 'right': '→'}
+
+
+class HotkeyError(ValueError):
+    """Raised for a binding that can't be parsed"""
+
+
+def normalize_key(key):
+    """Canonical lowercase name for a pynput Key/KeyCode or a plain string"""
+    if isinstance(key, str):
+        char = key
+    else:
+        name = getattr(key, 'name', None)
+        if name is not None:
+            return name  # pynput Key enum member (shift_r, up, f1, ...)
+        char = getattr(key, 'char', None)
+        if char is None:
+            vk = getattr(key, 'vk', None)
+            if vk is None:
+                return None
+            # X11 keysyms for A-Z and a-z are their ASCII codes
+            if 0x41 <= vk <= 0x5a or 0x61 <= vk <= 0x7a:
+                return chr(vk).lower()
+            return f"vk{vk}"
+    if len(char) == 1 and ord(char) < 0x20:
+        # Ctrl+letter arrives as a control character ('\x13' for Ctrl+S)
+        return chr(ord(char) + 0x60)
+    return char.lower()
+
+
+def parse_binding(spec):
+    """Parse "ctrl+shift+s" into (modifier bitmask, key name)"""
+    parts = [part.strip().lower() for part in spec.split('+')]
+    if not parts or not all(parts):
+        raise HotkeyError(f"Invalid hotkey: {spec!r}")
+    *modifiers, key = parts
+    mask = 0
+    for modifier in modifiers:
+        if modifier not in MODIFIER_NAMES:
+            raise HotkeyError(f"Unknown modifier {modifier!r} in hotkey {spec!r}")
+        mask |= MODIFIER_NAMES[modifier]
+    if key in MODIFIER_NAMES or key in MODIFIER_KEYS:
+        raise HotkeyError(f"Hotkey {spec!r} needs a non-modifier key")
+    return mask, key
+
+
+def describe_binding(mask, key):
+    """Human-readable form of a compiled binding, e.g. Ctrl+Shift+S"""
+    labels = [label for bit, label in MODIFIER_ORDER if mask & bit]
+    labels.append(KEY_LABELS.get(key, key.upper() if len(key) == 1 else key.capitalize()))
+    return '+'.join(labels)
+
+
+class HotkeyDispatcher:
+    """Compiled hotkey table plus the held-modifier state of one input stream"""
+
+    def __init__(self, bindings):
+        """bindings: action -> hotkey spec (None/empty disables the action)"""
+        self.table = {}
+        self.errors = []
+        for action, spec in bindings.items():
+            if not spec:
+                continue
+            if not isinstance(spec, str):
+                self.errors.append(f"Hotkey for {action} must be a string like \"ctrl+shift+s\", got {spec!r}")
+                continue
+            try:
+                combo = parse_binding(spec)
+            except HotkeyError as e:
+                self.errors.append(str(e))
+                continue
+            if combo in self.table:
+                self.errors.append(f"Hotkey {spec!r} is bound twice ({self.table[combo]}, {action})")
+                continue
+            self.table[combo] = action
+        self.modifiers = 0
+        self._held = {}  # held modifier key name -> bit (left/right tracked apart)
+
+    def press(self, key):
+        """Feed a key press; returns the bound action or None"""
+        name = normalize_key(key)
+        bit = MODIFIER_KEYS.get(name)
+        if bit is not None:
+            self._held[name] = bit
+            self.modifiers |= bit
+            return None
+        return self.table.get((self.modifiers, name))
+
+    def release(self, key):
+        """Feed a key release (only modifiers change state)"""
+        name = normalize_key(key)
+        if name in self._held:
+            del self._held[name]
+            mask = 0
+            for bit in self._held.values():
+                mask |= bit
+            self.modifiers = mask
+
+    def reset(self):
+        """Forget held modifiers (e.g. after the listener restarts)"""
+        self._held.clear()
+        self.modifiers = 0
+
+    def describe(self):
+        """action -> readable binding, for startup messages"""
+        return {action: describe_binding(mask, key) for (mask, key), action in self.table.items()}
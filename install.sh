@@ -140,69 +140,12 @@ create_launchers() {
     cat > "$INSTALL_DIR/keyboard_sound_control.sh" <<'EOF'
 #!/bin/bash
 # Keyboard Sound Daemon Control Script
+# Thin wrapper around keyboard_sound_control.py: start|stop|status|restart
 
 DAEMON_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-PID_FILE="$HOME/.keyboard_sound_daemon.pid"
-DAEMON_SCRIPT="$DAEMON_DIR/keyboard_sound_daemon_enhanced.py"
 VENV_PYTHON="$DAEMON_DIR/venv/bin/python3"
 
-start_daemon() {
-    if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
-        echo "Daemon is already running (PID: $(cat "$PID_FILE"))"
-        return 1
-    fi
-    
-    echo "Starting enx-kebord daemon..."
-    cd "$DAEMON_DIR"
-    nohup "$VENV_PYTHON" "$DAEMON_SCRIPT" > /dev/null 2>&1 &
-    echo "Daemon started"
-}
-
-stop_daemon() {
-    if [ -f "$PID_FILE" ]; then
-        PID=$(cat "$PID_FILE")
-        if kill -0 "$PID" 2>/dev/null; then
-            echo "Stopping daemon (PID: $PID)..."
-            kill "$PID"
-            rm -f "$PID_FILE"
-            echo "Daemon stopped"
-        else
-            echo "Daemon not running"
-            rm -f "$PID_FILE"
-        fi
-    else
-        echo "Daemon not running"
-    fi
-}
-
-status_daemon() {
-    if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
-        echo "Daemon is running (PID: $(cat "$PID_FILE"))"
-    else
-        echo "Daemon is not running"
-    fi
-}
-
-case "$1" in
-    start)
-        start_daemon
-        ;;
-    stop)
-        stop_daemon
-        ;;
-    restart)
-        stop_daemon
-        sleep 1
-        start_daemon
-        ;;
-    status)
-        status_daemon
-        ;;
-    *)
-        echo "Usage: $0 {start|stop|restart|status}"
-        exit 1
-        ;;
-esac
+exec "$VENV_PYTHON" "$DAEMON_DIR/keyboard_sound_control.py" "$@"
 EOF
     chmod +x "$INSTALL_DIR/keyboard_sound_control.sh"
 
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Single-instance lock for the enx-kebord daemon
+The daemon holds an exclusive flock() on LOCK_FILE for its whole life.
+The kernel drops it when the process exits - however it exits - so
+there is no stale state to clean up, and two racing starts cannot both
+win. The file also records the holder's PID for diagnostics.
+
+Finding the holder never touches the lock itself (a probing flock could
+make a daemon starting at that moment think another one is running): it
+is read from /proc/locks, or failing that from the recorded PID.
+"""
+
+import fcntl
+import os
+import signal
+import time
+from pathlib import Path
+
+LOCK_FILE = Path.home() / ".keyboard_sound_daemon.lock"
+PROC_LOCKS = "/proc/locks"
+ACQUIRE_RETRIES = 5  # wait_for_release() holds a shared lock for an instant
+ACQUIRE_RETRY_DELAY = 0.02
+
+
+class AlreadyRunningError(Exception):
+    """Raised when another daemon already holds the lock"""
+
+
+class InstanceLock:
+    """Exclusive flock held by the running daemon"""
+
+    def __init__(self, path=LOCK_FILE):
+        self.path = Path(path)
+        self.fd = None
+
+    def acquire(self):
+        """Take the lock without blocking for long; False if another daemon holds it"""
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o600)
+        for attempt in range(ACQUIRE_RETRIES):
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                # Held by a daemon, or by a waiter's momentary shared lock:
+                # only the first outlasts a short retry
+                if attempt == ACQUIRE_RETRIES - 1 or holder_pid(self.path):
+                    os.close(fd)
+                    return False
+                time.sleep(ACQUIRE_RETRY_DELAY)
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self.fd = fd
+        return True
+
+    def release(self):
+        if self.fd is not None:
+            try:
+                os.ftruncate(self.fd, 0)  # no stale PID for the fallback reader
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+
+def _exclusive_holders(path):
+    """PIDs holding an exclusive flock on path per /proc/locks; None if unreadable"""
+    try:
+        stat = os.stat(str(path))
+        with open(PROC_LOCKS, 'r') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    # "1: FLOCK  ADVISORY  WRITE 1234 fe:00:13533280 0 EOF" (device as hex major:minor)
+    file_id = f"{os.major(stat.st_dev):02x}:{os.minor(stat.st_dev):02x}:{stat.st_ino}"
+    pids = []
+    for line in lines:
+        fields = line.split()
+        if '->' in fields:
+            continue  # a blocked waiter, not a holder
+        if len(fields) >= 6 and fields[1] == 'FLOCK' and fields[3] == 'WRITE' and fields[5] == file_id:
+            pids.append(int(fields[4]))
+    return pids
+
+
+def _recorded_pid(path):
+    """PID written to the lock file, if that process is still alive"""
+    try:
+        content = Path(path).read_text().strip()
+        pid = int(content)
+        os.kill(pid, 0)
+    except PermissionError:
+        pass  # alive, but someone else's
+    except (OSError, ValueError):
+        return None
+    return pid
+
+
+def holder_pid(path=LOCK_FILE):
+    """PID of the daemon holding the lock, or None if nobody holds it (never locks)"""
+    if not Path(path).exists():
+        return None
+    holders = _exclusive_holders(path)
+    if holders is None:
+        return _recorded_pid(path)
+    return holders[0] if holders else None
+
+
+def wait_for_release(path=LOCK_FILE, timeout=5.0):
+    """Block until no daemon holds the lock; False on timeout
+
+    Sleeps inside flock() itself (interrupted by an interval timer for the
+    timeout), so the caller wakes the moment the old daemon exits.
+    Main thread only.
+    """
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return True
+
+    def expired(signum, frame):
+        raise TimeoutError()
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        os.close(fd)
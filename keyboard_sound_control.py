@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Control CLI for the enx-kebord daemon
+
+Usage:
+  python3 keyboard_sound_control.py start      # start and wait until keystrokes are audible
+  python3 keyboard_sound_control.py stop       # stop and wait until the daemon has exited
+  python3 keyboard_sound_control.py status     # exit 0 if running, 3 if not
+  python3 keyboard_sound_control.py restart    # stop, then start (no fixed sleeps)
+  python3 keyboard_sound_control.py set-sound thock   # switch the running daemon's sound
+
+Whether a daemon runs is decided by the instance lock it holds, not by a
+PID file, and start/restart wait on a readiness pipe the daemon writes
+once its input listener is up.
+"""
+import os, sys
+from pathlib import Path
+
+# Ensure venv is used
+BASE = Path(__file__).resolve().parent
+VENV_PY = BASE / 'venv' / 'bin' / 'python3'
+if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+    os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
+
+import argparse
+import json
+import select
+import signal
+import subprocess
+import time
+
+from control_socket import ControlError, send_command, CLIENT_TIMEOUT
+from instance_lock import holder_pid, wait_for_release
+from notifications import SEND_TIMEOUT
+
+DAEMON_PATH = BASE / 'keyboard_sound_daemon_enhanced.py'
+READY_FD_ENV = 'ENX_KEBORD_READY_FD'
+START_TIMEOUT = 15.0
+# The daemon releases its lock last: after flushing and joining the notifier
+# (SEND_TIMEOUT each) and joining the status publisher (CLIENT_TIMEOUT), plus
+# slack for closing the audio device and listener
+STOP_TIMEOUT = 2 * SEND_TIMEOUT + CLIENT_TIMEOUT + 2.0
+
+# Exit codes (status follows the LSB init-script convention)
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_NOT_RUNNING = 3
+
+
+def start(timeout=START_TIMEOUT):
+    pid = holder_pid()
+    if pid:
+        print(f"Keyboard sound daemon is already running (PID: {pid})")
+        return EXIT_OK
+
+    print("Starting keyboard sound daemon...")
+    ready_read, ready_write = os.pipe()
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='hide')
+    env[READY_FD_ENV] = str(ready_write)
+    started = time.monotonic()
+    try:
+        process = subprocess.Popen([sys.executable, str(DAEMON_PATH)], cwd=str(BASE), env=env,
+                                   stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL, pass_fds=(ready_write,),
+                                   start_new_session=True)
+    finally:
+        os.close(ready_write)
+
+    # The daemon writes "ready" once keystrokes are audible; EOF means it exited
+    try:
+        readable, _, _ = select.select([ready_read], [], [], timeout)
+        reply = os.read(ready_read, 64) if readable else None
+    finally:
+        os.close(ready_read)
+
+    if reply is None:
+        print(f"Daemon (PID: {process.pid}) not ready after {timeout:.0f}s")
+        return EXIT_FAILED
+    if not reply.startswith(b'ready'):
+        pid = holder_pid()
+        if pid and pid != process.pid:
+            print(f"Keyboard sound daemon is already running (PID: {pid})")
+            return EXIT_OK
+        print("Daemon failed to start (run keyboard_sound_daemon_enhanced.py directly to see why)")
+        return EXIT_FAILED
+    print(f"Daemon ready (PID: {process.pid}) in {time.monotonic() - started:.2f}s")
+    return EXIT_OK
+
+
+def stop(timeout=STOP_TIMEOUT):
+    pid = holder_pid()
+    if not pid:
+        print("Daemon not running.")
+        return EXIT_OK
+
+    print(f"Stopping keyboard sound daemon (PID: {pid})...")
+    try:
+        send_command('stop')
+    except ControlError:
+        # Control socket disabled or unresponsive: fall back to a signal
+        if pid > 0:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    if not wait_for_release(timeout=timeout):
+        print(f"Daemon did not exit within {timeout:.0f}s")
+        return EXIT_FAILED
+    print("Daemon stopped.")
+    return EXIT_OK
+
+
+def restart():
+    result = stop()
+    if result != EXIT_OK:
+        return result
+    return start()
+
+
+def set_sound(sound):
+    try:
+        reply = send_command('set-sound', sound=sound)
+    except ControlError as e:
+        print(f"Could not switch sound: {e}")
+        return EXIT_FAILED if holder_pid() else EXIT_NOT_RUNNING
+    print(f"Switched to sound: {reply['sound']}")
+    return EXIT_OK
+
+
+def status(as_json=False):
+    pid = holder_pid()
+    try:
+        info = send_command('status')
+    except ControlError:
+        info = None
+
+    if as_json:
+        print(json.dumps(info or {'running': bool(pid), 'pid': pid}, indent=2))
+    elif info:
+        health = "" if info.get('healthy', True) else ", UNHEALTHY"
+        print(f"Keyboard sound daemon is running (PID: {info['pid']}, sound: {info['sound']}, "
+              f"up {info['uptime_s']:.0f}s{health})")
+    elif pid:
+        print(f"Keyboard sound daemon is running (PID: {pid}, control socket not available)")
+    else:
+        print("Daemon not running.")
+    return EXIT_OK if info or pid else EXIT_NOT_RUNNING
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Control the enx-kebord keyboard sound daemon')
+    parser.add_argument('command', choices=['start', 'stop', 'status', 'restart', 'set-sound'])
+    parser.add_argument('sound', nargs='?', help='Sound type for set-sound')
+    parser.add_argument('--json', action='store_true', help='Print status as JSON')
+    args = parser.parse_args()
+    if args.command == 'status':
+        sys.exit(status(args.json))
+    if args.command == 'set-sound':
+        if not args.sound:
+            parser.error("set-sound needs a sound type")
+        sys.exit(set_sound(args.sound))
+    sys.exit({'start': start, 'stop': stop, 'restart': restart}[args.command]())
@@ -14,9 +14,11 @@ if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
 from pathlib import Path
 from pynput import keyboard
 import pygame
+import select
 import signal
 import threading
-import time
+
+from sound_format import open_mixer, mixer_sound
 
 # Configuration
 BASE_DIR = Path(__file__).parent.resolve()
@@ -27,6 +29,10 @@ class KeyboardSoundDaemon:
     def __init__(self):
         self.stop_flag = False
         self.sound = None
+        # run() sleeps on this pipe until a signal or listener exit writes to it
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        os.set_blocking(self.wakeup_write, False)
         
         # Write PID file for process management
         with open(PID_FILE, 'w') as f:
@@ -35,15 +41,15 @@ class KeyboardSoundDaemon:
         # Initialize pygame mixer (suppress pygame welcome message)
         os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
         try:
-            pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
-            pygame.mixer.init()
+            # Device-native rate/channels; sounds are converted to match once and cached
+            open_mixer()
         except Exception as e:
             sys.exit(1)
 
         # Load sound file 
         if SOUND_FILE.exists():
             try:
-                self.sound = pygame.mixer.Sound(str(SOUND_FILE))
+                self.sound = mixer_sound(SOUND_FILE)
             except Exception:
                 self.sound = None
 
@@ -70,6 +76,20 @@ class KeyboardSoundDaemon:
     def signal_handler(self, signum, frame):
         """Handle termination signals"""
         self.stop_flag = True
+        self.wake()
+
+    def wake(self):
+        """Wake the main loop"""
+        try:
+            os.write(self.wakeup_write, b'\0')
+        except OSError:
+            pass
+
+    def watch_listener(self, listener):
+        """Stop when the listener thread exits (blocks in join, no polling)"""
+        listener.join()
+        self.stop_flag = True
+        self.wake()
         
     def cleanup(self):
         """Clean up resources"""
@@ -90,15 +110,21 @@ class KeyboardSoundDaemon:
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGTERM, self.signal_handler)
         signal.signal(signal.SIGINT, self.signal_handler)
+        signal.set_wakeup_fd(self.wakeup_write)
 
         try:
             with keyboard.Listener(
                 on_press=self.on_press,
                 on_release=self.on_release) as listener:
+                threading.Thread(target=self.watch_listener, args=(listener,), daemon=True).start()
                 
-                # Keep the daemon running
+                # Sleep until a signal or listener exit; no periodic wakeups
                 while not self.stop_flag:
-                    time.sleep(0.1)
+                    select.select([self.wakeup_read], [], [])
+                    try:
+                        os.read(self.wakeup_read, 4096)
+                    except BlockingIOError:
+                        pass
                     
         except Exception:
             pass  # Silently handle any errors
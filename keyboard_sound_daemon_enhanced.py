@@ -6,30 +6,55 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 Enhanced Keyboard Sound Daemon
 Features:
 - Automatic volume reduction for headphones
-- Global hotkeys for control (Shift+Up/Down, Ctrl+Shift+S)
+- Configurable global hotkeys (default Shift+Up/Down, Ctrl+Shift+S)
 - Sound cycling capability
 - Headphone detection (wired/Bluetooth)
+- Event-driven device change detection (pactl subscribe + inotify, no polling)
+- Callback-driven low-latency mixer engine with soft limiter
+- Randomized per-keypress sound variants (pre-rendered, no I/O on the hot path)
+- Key-release (upstroke) samples preloaded alongside the press samples
+- Input capture decoupled from audio through a lock-free event queue
+- Per-stage keypress-to-sound latency histograms (SIGUSR1 dumps them)
+- Pluggable input source and audio output (headless benchmarks)
+- Fast cold start (background variant rendering and probing, --profile-startup)
+- Unix-domain control socket for instant sound/volume switching
+- flock-based single-instance lock with a startup readiness handshake
+- Supervised background workers (restart with backoff, health in status)
+- Asynchronous, coalescing desktop notifications (persistent D-Bus connection)
 """
 
 import os
 import sys
+import time
 from pathlib import Path
+# Startup profiling origin (--profile-startup); taken before the heavy imports
+PROCESS_START = time.perf_counter()
+PROCESS_START_WALL = time.time()
 BASE = Path(__file__).resolve().parent
 VENV_PY = BASE / 'venv' / 'bin' / 'python3'
-if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+if __name__ == "__main__" and VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+    os.environ['ENX_KEBORD_EXEC_START'] = str(time.time())
     os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
 
+import argparse
 import json
-import subprocess
-from pathlib import Path
-from pynput import keyboard
-from pynput.keyboard import Key, KeyCode, Listener
-import pygame
+import queue
+import select
 import signal
 import threading
-import time
-import psutil
-import glob
+from audio_engine import (MixerEngine, SDLCallbackOutput,
+                          DEFAULT_SAMPLE_RATE, DEFAULT_CHANNELS, DEFAULT_BUFFER_FRAMES,
+                          DEFAULT_MAX_VOICES, DEFAULT_VARIANTS, DEFAULT_LIMITER_RELEASE_MS)
+from event_queue import EventQueue, KEY_PRESS, KEY_RELEASE, INPUT_RESET, DEFAULT_QUEUE_CAPACITY
+from latency_stats import LatencyRecorder, STAGE_QUEUE
+from sound_format import converted
+from sound_bank import SoundBank, bank_path, release_name
+from control_socket import ControlServer, StatusPublisher, require
+from hotkeys import HotkeyDispatcher
+from notifications import Notifier
+from supervisor import Supervisor, DEFAULT_MAX_RESTARTS
+from instance_lock import InstanceLock, AlreadyRunningError, holder_pid
+from audio_devices import AudioProbe, DeviceChangeMonitor, DeviceStatusService, DEFAULT_STATUS_TTL
 
 # Configuration
 BASE_DIR = Path(__file__).parent.resolve()
@@ -37,6 +62,23 @@ SOUND_DIR = BASE_DIR / "generated_sounds"
 CURRENT_SOUND_FILE = BASE_DIR / "key_press.wav"
 PID_FILE = Path.home() / ".keyboard_sound_daemon.pid"
 CONFIG_FILE = Path.home() / ".keyboard_sound_config.json"
+LATENCY_FILE = Path.home() / ".keyboard_sound_latency.json"
+READY_FD_ENV = 'ENX_KEBORD_READY_FD'  # pipe the control CLI waits on for startup
+
+# Hotkey bindings (action -> combination); the "hotkeys" config key overrides them
+DEFAULT_HOTKEYS = {
+    'cycle_sound': 'ctrl+shift+s',
+    'start_daemon': 'shift+up',
+    'stop_daemon': 'shift+down',
+}
+
+# Device volume multipliers (the status reply carries the resulting effective_volume)
+HEADPHONE_MULTIPLIER = 0.1  # very quiet in headphones
+SPEAKER_MULTIPLIER = 0.8
+
+# Generator settings used when rendering variant pools (match sound_generator.py defaults)
+SOUND_DURATION = 0.15
+SOUND_FREQUENCY = 800
 
 # Available sound types (in order for cycling)
 SOUND_TYPES = ['blue', 'brown', 'red', 'mechanical', 'typewriter', 'creamy', 'dry', 
@@ -47,114 +89,233 @@ class AudioDeviceDetector:
     
     @staticmethod
     def detect_headphones():
-        """Detect if headphones (wired or Bluetooth) are connected"""
+        """Detect if headphones (wired, USB or Bluetooth) are connected"""
         try:
-            # Method 1: Check PulseAudio/PipeWire sinks for headphone indicators
-            try:
-                pa_result = subprocess.run(['pactl', 'list', 'sinks'], capture_output=True, text=True, timeout=5)
-                if pa_result.returncode == 0:
-                    output_lower = pa_result.stdout.lower()
-                    # Look for headphone/headset indicators
-                    headphone_indicators = ['headphone', 'headset', 'usb audio', 'usb-audio', 'usb_audio']
-                    if any(indicator in output_lower for indicator in headphone_indicators):
-                        return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-            
-            # Method 2: Check ALSA for headphone/USB devices
-            try:
-                result = subprocess.run(['aplay', '-l'], capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    output_lower = result.stdout.lower()
-                    # Look for USB audio or headphone indicators
-                    usb_indicators = ['usb audio', 'usb-audio', 'headphone', 'headset']
-                    if any(indicator in output_lower for indicator in usb_indicators):
-                        return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-            
-            # Method 3: Check for Bluetooth audio devices
-            try:
-                bt_result = subprocess.run(['bluetoothctl', 'devices'], capture_output=True, text=True, timeout=3)
-                if bt_result.returncode == 0:
-                    bt_devices = bt_result.stdout.lower()
-                    if bt_devices.strip():  # If there are any Bluetooth devices
-                        # Check if any are connected
-                        bt_info = subprocess.run(['bluetoothctl', 'info'], capture_output=True, text=True, timeout=3)
-                        if 'connected: yes' in bt_info.stdout.lower():
-                            audio_indicators = ['headphone', 'headset', 'speaker', 'audio']
-                            if any(indicator in bt_devices for indicator in audio_indicators):
-                                return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-            
-            # Method 4: Check /proc/asound/cards for USB/headphone devices
-            try:
-                with open('/proc/asound/cards', 'r') as f:
-                    cards_content = f.read().lower()
-                    if any(indicator in cards_content for indicator in ['usb-audio', 'headphone', 'headset']):
-                        return True
-            except (IOError, FileNotFoundError):
-                pass
-                    
+            return AudioProbe().detect_headphones()
         except Exception:
-            pass
-        
-        return False
+            return False
     
     @staticmethod
     def get_volume_multiplier():
         """Get volume multiplier based on audio device"""
         if AudioDeviceDetector.detect_headphones():
-            return 0.1  # Reduce volume to 10% for headphones (very quiet)
-        return 0.8  # 80% volume for speakers (also reduced from 100%)
+            return HEADPHONE_MULTIPLIER
+        return SPEAKER_MULTIPLIER
+
+class PynputInputSource:
+    """Global keyboard capture through pynput (needs an X session)"""
 
-class KeyboardSoundDaemonEnhanced:
     def __init__(self):
+        self.listener = None
+
+    def start(self, on_press, on_release):
+        """Start delivering key events to the callbacks from the listener thread"""
+        try:
+            # Imported here: it connects to X, and headless runs never need it
+            from pynput import keyboard
+        except Exception as e:
+            raise RuntimeError(f"pynput keyboard backend is not available: {e}")
+        self.listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        self.listener.daemon = True
+        self.listener.start()
+
+    def wait(self):
+        """Block until the listener thread exits (e.g. the X connection is lost)"""
+        if self.listener:
+            self.listener.join()
+
+    def stop(self):
+        if self.listener:
+            try:
+                self.listener.stop()
+            except Exception:
+                pass
+
+class StartupProfiler:
+    """Wall-clock time per startup phase, reported by --profile-startup"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []      # (name, seconds in phase)
+        self.background = {}  # name -> seconds since process start
+        self.ready_at = None
+        self._last = PROCESS_START
+        exec_start = os.environ.pop('ENX_KEBORD_EXEC_START', None)
+        self.exec_seconds = PROCESS_START_WALL - float(exec_start) if exec_start else None
+
+    def mark(self, name):
+        """Close the current phase under this name"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def event(self, name):
+        """Record when a background task finished (first time only)"""
+        self.background.setdefault(name, time.perf_counter() - PROCESS_START)
+
+    def ready(self):
+        """Input listener is up: the next keystroke is audible"""
+        self.ready_at = time.perf_counter() - PROCESS_START
+
+    def report(self):
+        lines = ["Startup profile (ms):"]
+        if self.exec_seconds is not None:
+            lines.append(f"  {'venv re-exec':<32}{self.exec_seconds * 1000:9.1f}")
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<32}{seconds * 1000:9.1f}")
+        if self.ready_at is not None:
+            total = self.ready_at + (self.exec_seconds or 0.0)
+            lines.append(f"  {'first keystroke audible':<32}{total * 1000:9.1f}  (since launch)")
+        for name, seconds in sorted(self.background.items(), key=lambda item: item[1]):
+            lines.append(f"  {name + ' (background)':<32}{seconds * 1000:9.1f}  (since start)")
+        return "\n".join(lines)
+
+class KeyboardSoundDaemonEnhanced:
+    def __init__(self, config=None, audio_output=None, input_source=None, write_pid=True,
+                 profiler=None, single_instance=True):
+        """
+        config: settings dict used instead of CONFIG_FILE (nothing is persisted)
+        audio_output: factory taking the MixerEngine (default SDLCallbackOutput)
+        input_source: object with start(on_press, on_release)/stop() (default pynput)
+        write_pid: write PID_FILE for the control scripts
+        profiler: StartupProfiler collecting per-phase startup times
+        single_instance: hold the instance lock (raises AlreadyRunningError if taken)
+        """
+        self.profiler = profiler or StartupProfiler()
+        self.profiler.mark('imports')
+
+        # Refuse to start twice before doing any expensive setup
+        self.instance_lock = None
+        if single_instance:
+            self.instance_lock = InstanceLock()
+            if not self.instance_lock.acquire():
+                raise AlreadyRunningError(f"Daemon already running (PID {holder_pid()})")
         self.stop_flag = False
-        self.sound = None
-        self.volume_multiplier = 1.0
+        # The main thread sleeps on this pipe; signals (set_wakeup_fd), stop
+        # requests and listener exit write to it
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        os.set_blocking(self.wakeup_write, False)
+        self.sound = None  # VariantPool for the current sound type
+        self.release_sound = None  # VariantPool of matching upstroke samples
+        self.volume_multiplier = 1.0  # device-dependent (headphones vs speakers)
+        self.headphones_connected = False
+        self.volume = 1.0  # user volume, set over the control socket
+        self.gain = 1.0  # volume * volume_multiplier, read on the hot path
+        self.sound_lock = threading.Lock()
+        self.control_server = None
+        self.status_publisher = None  # pushes status changes to subscribed clients
+        self.started_at = time.monotonic()
         self.current_sound_index = 0
-        self.hotkey_listener = None
-        self.pressed_keys = set()
+        self.config = {}
+        self.persist_config = config is None
+        self.write_pid = write_pid
+        self.audio_output = None
+        self.input_source = input_source if input_source is not None else PynputInputSource()
+        self.events_coalesced = 0
+        self.input_started = False  # the input source is capturing (restarted by its worker)
+        self.bank = None  # SoundBank holding every sound; self.sound/release_sound point into it
+        self.rendering = False  # a background render of the bank is in progress
         
         # Load configuration
-        self.load_config()
+        self.load_config(config)
+        self.volume = float(self.config.get('volume', 1.0))
         
         # Write PID file for process management
-        try:
-            with open(PID_FILE, 'w') as f:
-                f.write(str(os.getpid()))
-        except IOError:
-            pass  # Continue even if we can't write PID file
+        if self.write_pid:
+            try:
+                with open(PID_FILE, 'w') as f:
+                    f.write(str(os.getpid()))
+            except IOError:
+                pass  # Continue even if we can't write PID file
+        self.profiler.mark('config')
+
+        # Headphone detection answers asynchronously, probing in parallel with
+        # the audio setup below
+        self.device_status = DeviceStatusService(ttl=self.config.get('device_status_ttl', DEFAULT_STATUS_TTL))
+
+        # Background loops run supervised: restarted with backoff if they crash
+        self.supervisor = Supervisor(
+            max_restarts=self.config.get('worker_max_restarts', DEFAULT_MAX_RESTARTS),
+            on_give_up=self.on_worker_failed,
+            on_state_change=lambda worker: self.publish_status(),
+        )
+        self.device_monitor = None
+        if self.config.get('device_monitor', True):
+            # Play at the quieter headphone level until the first probe answers
+            self.headphones_connected = True
+            self.device_status.subscribe(self.on_device_status)
+            self.device_status.refresh_async()
+
+            # Device monitoring thread (event-driven, sleeps until a change)
+            self.device_monitor = DeviceChangeMonitor(self.device_status.refresh)
+            self.supervisor.spawn('device_monitor', self.monitor_audio_devices)
+        self.profiler.mark('device monitor')
 
+        # Latency histograms shared by the audio worker and the mixer
+        self.latency = LatencyRecorder(enabled=self.config.get('latency_recording', True))
+
+        # Mixer engine: the SDL callback thread pulls mixed voices from it
+        # sample_rate unset means "whatever the device runs at" (negotiated on open)
+        self.engine = MixerEngine(
+            sample_rate=self.config.get('sample_rate') or DEFAULT_SAMPLE_RATE,
+            channels=self.config.get('channels', DEFAULT_CHANNELS),
+            buffer_frames=self.config.get('buffer_frames', DEFAULT_BUFFER_FRAMES),
+            max_voices=self.config.get('max_voices', DEFAULT_MAX_VOICES),
+            steal_policy=self.config.get('steal_policy', 'oldest'),
+            limiter_release_ms=self.config.get('limiter_release_ms', DEFAULT_LIMITER_RELEASE_MS),
+            latency=self.latency,
+        )
         os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
         try:
-            pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
-            pygame.mixer.init()
-            print("Audio system initialized successfully")
+            if audio_output is None:
+                self.audio_output = SDLCallbackOutput(self.engine, negotiate=not self.config.get('sample_rate'))
+            else:
+                self.audio_output = audio_output(self.engine)
+            self.audio_output.start()
+            print(f"Audio system initialized successfully ({self.engine.sample_rate} Hz, "
+                  f"{self.engine.channels} ch, {self.engine.buffer_frames}-frame buffer)")
         except Exception as e:
+            self.audio_output = None
             print(f"Warning: Could not initialize audio system: {e}")
             print("Daemon will continue but sounds may not work")
+        self.profiler.mark('audio output')
 
-        # Load current sound and detect headphones
-        self.load_sound()
+        # Load current sound in the negotiated format (cold start: WAV now,
+        # variants rendered in the background)
+        self.load_sound(fast=self.config.get('fast_start', True))
+        self.profiler.mark('first sound')
         self.update_volume()
-        
-        # Start volume monitoring thread
-        self.volume_monitor_thread = threading.Thread(target=self.monitor_audio_devices, daemon=True)
-        self.volume_monitor_thread.start()
-        
-        # Start global hotkey listener
-        self.start_hotkey_listener()
 
-    def load_config(self):
-        """Load configuration from file"""
+        # Input callbacks only enqueue; the audio worker plays sounds and detects
+        # hotkeys, and hotkey actions run on their own command thread
+        self.event_queue = EventQueue(self.config.get('event_queue_capacity', DEFAULT_QUEUE_CAPACITY))
+        self.command_queue = queue.Queue()
+        self.hotkeys = self.build_hotkeys()
+        self.notifier = Notifier(enabled=self.config.get('notifications', True))
+        self.notifier.start()
+        self.supervisor.spawn('audio_worker', self.process_input_events, critical=True)
+        self.supervisor.spawn('commands', self.process_commands)
+        print("Global hotkeys enabled")
+        self.profiler.mark('workers')
+
+    def load_config(self, config=None):
+        """Load configuration from file (or from an injected settings dict)"""
+        if config is not None:
+            self.config = dict(config)
+            self.current_sound_index = 0
+            if self.config.get('current_sound_type') in SOUND_TYPES:
+                self.current_sound_index = SOUND_TYPES.index(self.config['current_sound_type'])
+            return
         try:
             if CONFIG_FILE.exists():
                 with open(CONFIG_FILE, 'r') as f:
                     config = json.load(f)
+                    self.config = config
                     self.current_sound_index = config.get('current_sound_index', 0)
+                    # The GUI records the selection by name
+                    if config.get('current_sound_type') in SOUND_TYPES:
+                        self.current_sound_index = SOUND_TYPES.index(config['current_sound_type'])
                     # Ensure index is within bounds
                     if self.current_sound_index >= len(SOUND_TYPES):
                         self.current_sound_index = 0
@@ -165,211 +326,570 @@ class KeyboardSoundDaemonEnhanced:
 
     def save_config(self):
         """Save configuration to file"""
+        if not self.persist_config:
+            return
         try:
-            config = {
+            config = dict(self.config)
+            config.update({
                 'current_sound_index': self.current_sound_index,
                 'current_sound_type': SOUND_TYPES[self.current_sound_index]
-            }
-            with open(CONFIG_FILE, 'w') as f:
+            })
+            # Written aside and renamed, so the GUI never reads a half-written file
+            temporary = CONFIG_FILE.with_name(f".{CONFIG_FILE.name}.{os.getpid()}")
+            with open(temporary, 'w') as f:
                 json.dump(config, f, indent=2)
+            os.replace(str(temporary), str(CONFIG_FILE))
         except IOError:
             pass
 
-    def load_sound(self):
-        """Load the current sound file"""
-        if CURRENT_SOUND_FILE.exists():
-            try:
-                self.sound = pygame.mixer.Sound(str(CURRENT_SOUND_FILE))
-                print(f"Loaded sound: {CURRENT_SOUND_FILE}")
-            except Exception as e:
-                print(f"Error loading sound: {e}")
-                self.sound = None
-        else:
-            print(f"Sound file not found: {CURRENT_SOUND_FILE}")
-
-    def update_volume(self):
-        """Update volume based on current audio device"""
-        self.volume_multiplier = AudioDeviceDetector.get_volume_multiplier()
-        if self.sound:
-            try:
-                self.sound.set_volume(self.volume_multiplier)
-                device_type = "headphones" if self.volume_multiplier == 0.1 else "speakers"
-                print(f"Volume adjusted for {device_type}: {int(self.volume_multiplier * 100)}%")
-            except Exception:
-                pass
+    def render_variants(self, sound_type, count, release=False):
+        """Render count randomized press (or release) variants at the engine's rate"""
+        from sound_generator import KeyboardSoundGenerator
+
+        generator = KeyboardSoundGenerator(sample_rate=self.engine.sample_rate)
+        return generator.render_variants(sound_type, count, SOUND_FREQUENCY, SOUND_DURATION, release)
+
+    def load_sound(self, fast=False):
+        """Build the sound bank (every sound type, all variants) and select the current sound
+
+        A bank file written by sound_generator.py is mapped as is. Otherwise
+        the variants are rendered; fast: start with the current sound's WAV
+        files only and render the full bank on a background thread (cold start)
+        """
+        self.bank = self.open_bank_file()
+        if self.bank is not None:
+            self.select_sound()
+            return
+        sound_type = SOUND_TYPES[self.current_sound_index]
+        if fast and int(self.config.get('variants', DEFAULT_VARIANTS)) > 1:
+            self.bank = self.build_bank(render=False, sound_types=[sound_type])
+            self.select_sound()
+            if self.sound is not None:
+                self.rendering = True
+                threading.Thread(target=self.finish_loading, daemon=True).start()
+                return
+        self.bank = self.build_bank()
+        self.select_sound()
+
+    def open_bank_file(self):
+        """Map the generator's packed bank for the engine's rate, if it fits the config"""
+        path = bank_path(SOUND_DIR, self.engine.sample_rate)
+        if not self.config.get('bank_file', True) or not path.exists():
+            return None
+        try:
+            bank = SoundBank.open(path, self.config.get('variant_selection', 'random'))
+        except (OSError, ValueError) as e:
+            print(f"Ignoring sound bank {path}: {e}")
+            return None
+        # The file name is only a hint: a stale or copied bank would play at the wrong pitch
+        if bank.sample_rate != self.engine.sample_rate:
+            print(f"Sound bank {path} is {bank.sample_rate} Hz but the mixer runs at "
+                  f"{self.engine.sample_rate} Hz, rendering instead")
+            return None
+        count = int(self.config.get('variants', DEFAULT_VARIANTS))
+        names = list(SOUND_TYPES)
+        if self.config.get('release_sounds', True):
+            names += [release_name(sound_type) for sound_type in SOUND_TYPES]
+        if any(bank.variant_count(name) != count for name in names):
+            print(f"Sound bank {path} does not hold {count} variants of every sound, rendering instead")
+            return None
+        print(f"Mapped sound bank: {path} ({bank.nbytes / 1048576:.1f} MiB)")
+        return bank
+
+    def finish_loading(self):
+        """Background half of a fast load: swap in the fully rendered bank"""
+        bank = self.build_bank()
+        with self.sound_lock:
+            self.bank = bank
+            self.select_sound()
+        self.rendering = False
+        self.profiler.event('variants rendered')
+        self.publish_status()
+
+    def build_bank(self, render=True, sound_types=SOUND_TYPES):
+        """SoundBank of rendered variants (or the WAV files) for the given sound types"""
+        count = int(self.config.get('variants', DEFAULT_VARIANTS))
+        release_sounds = self.config.get('release_sounds', True)
+        render = render and count > 1
+        sounds = {}
+        for sound_type in sound_types:
+            press = release = None
+            if render:
+                try:
+                    press = self.render_variants(sound_type, count)
+                    if release_sounds:
+                        release = self.render_variants(sound_type, count, release=True)
+                except Exception as e:
+                    print(f"Could not render variants ({e}), falling back to WAV files")
+                    render = False
+            if press is None:
+                press = self.load_wav_samples(sound_type)
+            if release is None and release_sounds:
+                release = self.load_wav_samples(sound_type, release=True)
+            sounds[sound_type] = press
+            sounds[release_name(sound_type)] = release
+        bank = SoundBank.from_sounds(sounds, self.engine.sample_rate,
+                                     self.config.get('variant_selection', 'random'))
+        if render:
+            print(f"Sound bank: {len(sound_types)} sounds x {count} variants, {bank.nbytes / 1048576:.1f} MiB")
+        return bank
+
+    def load_wav_samples(self, sound_type, release=False):
+        """The sound's WAV file as a one-variant list (empty if missing)"""
+        suffix = '_release' if release else ''
+        candidates = [SOUND_DIR / f"keyboard_{sound_type}{suffix}.wav"]
+        if not release:
+            candidates.append(CURRENT_SOUND_FILE)
+        for sound_file in candidates:
+            if sound_file.exists():
+                try:
+                    # Converted once into the engine's format and cached
+                    return [converted(sound_file, self.engine.sample_rate)]
+                except Exception as e:
+                    print(f"Error loading sound: {e}")
+        return []
+
+    def select_sound(self):
+        """Point the current press/release pools into the bank (a reference swap)"""
+        sound_type = SOUND_TYPES[self.current_sound_index]
+        bank = self.bank
+        if sound_type not in bank:
+            # Before the background render has finished: load just this sound
+            bank = self.build_bank(render=False, sound_types=[sound_type])
+        self.sound = bank.pool(sound_type)
+        self.release_sound = (bank.pool(release_name(sound_type))
+                              if self.config.get('release_sounds', True) else None)
+        if self.sound is None:
+            print(f"Sound file not found for: {sound_type}")
+
+    def update_volume(self, headphones=None):
+        """Update volume for the audio device (None keeps the last known one)"""
+        if not self.config.get('device_monitor', True):
+            # Assume speakers when device probing is disabled
+            self.volume_multiplier = SPEAKER_MULTIPLIER
+            self.update_gain()
+            return
+        if headphones is not None:
+            self.headphones_connected = headphones
+        self.volume_multiplier = HEADPHONE_MULTIPLIER if self.headphones_connected else SPEAKER_MULTIPLIER
+        self.update_gain()
+        device_type = "headphones" if self.headphones_connected else "speakers"
+        print(f"Volume adjusted for {device_type}: {int(self.volume_multiplier * 100)}%")
+        self.publish_status()
 
     def monitor_audio_devices(self):
-        """Monitor for audio device changes"""
-        last_headphone_state = AudioDeviceDetector.detect_headphones()
-        
-        while not self.stop_flag:
-            try:
-                current_headphone_state = AudioDeviceDetector.detect_headphones()
-                if current_headphone_state != last_headphone_state:
-                    self.update_volume()
-                    last_headphone_state = current_headphone_state
-                time.sleep(5)  # Check every 5 seconds
-            except Exception:
-                pass
+        """Re-probe the output device whenever the system reports a change"""
+        self.device_monitor.run()
+
+    def on_device_status(self, result):
+        """Detection service callback: headphones came or went"""
+        self.profiler.event('device probe')
+        self.update_volume(result['headphones'])
+
+    def set_sound(self, sound_type):
+        """Switch to another sound type in-process (next keystroke uses it)"""
+        if sound_type not in SOUND_TYPES:
+            raise ValueError(f"Unknown sound: {sound_type}")
+        with self.sound_lock:
+            self.current_sound_index = SOUND_TYPES.index(sound_type)
+            self.select_sound()
+            self.save_config()
+        print(f"Switched to sound: {sound_type}")
+        self.publish_status()
+
+    def set_volume(self, volume):
+        """Set the user volume (0.0-1.0), applied on top of the device multiplier"""
+        volume = float(volume)
+        if not 0.0 <= volume <= 1.0:
+            raise ValueError(f"Volume must be between 0.0 and 1.0, got {volume}")
+        self.volume = volume
+        self.config['volume'] = volume
+        self.update_gain()
+        self.save_config()
+        self.publish_status()
+
+    def update_gain(self):
+        """Recompute the per-voice gain used on the hot path"""
+        self.gain = self.volume * self.volume_multiplier
 
     def cycle_sound(self):
         """Cycle to the next sound in the list"""
-        self.current_sound_index = (self.current_sound_index + 1) % len(SOUND_TYPES)
-        current_sound_type = SOUND_TYPES[self.current_sound_index]
-        
-        # Update the current sound file
-        sound_file = SOUND_DIR / f"keyboard_{current_sound_type}.wav"
-        if sound_file.exists():
-            try:
-                # Copy the new sound to the current sound file
-                subprocess.run(['cp', str(sound_file), str(CURRENT_SOUND_FILE)], check=True)
-                self.load_sound()
-                self.update_volume()
-                self.save_config()
+        current_sound_type = SOUND_TYPES[(self.current_sound_index + 1) % len(SOUND_TYPES)]
+        self.set_sound(current_sound_type)
                 
-                print(f"Switched to sound: {current_sound_type}")
-                
-                # Show notification (if available)
-                try:
-                    subprocess.run([
-                        'notify-send', 
-                        'enx-kebord', 
-                        f'Switched to: {current_sound_type}',
-                        '-t', '2000'
-                    ], check=False, timeout=5)
-                except:
-                    pass
-                    
-            except subprocess.SubprocessError as e:
-                print(f"Error switching sound: {e}")
+        # Show notification (queued; rapid cycling only shows the last sound)
+        self.notifier.notify('enx-kebord', f'Switched to: {current_sound_type}', 2000, key='sound')
 
-    def start_hotkey_listener(self):
-        """Start the global hotkey listener"""
-        def on_press(key):
-            try:
-                self.pressed_keys.add(key)
-                
-                # Check for hotkey combinations
-                if self.is_hotkey_pressed([Key.shift, Key.up]):
-                    self.start_daemon()
-                elif self.is_hotkey_pressed([Key.shift, Key.down]):
-                    self.stop_daemon()
-                elif self.is_hotkey_pressed([Key.ctrl, Key.shift, KeyCode.from_char('s')]):
-                    self.cycle_sound()
-            except Exception:
-                pass
+    def control_handlers(self):
+        """Commands served on the control socket"""
+        return {
+            'set-sound': lambda args: self.handle_set_sound(args),
+            'set-volume': lambda args: self.handle_set_volume(args),
+            'status': lambda args: self.status(),
+            'stats': lambda args: self.latency_report(),
+            'stop': lambda args: self.handle_stop(),
+        }
 
-        def on_release(key):
-            try:
-                self.pressed_keys.discard(key)
-            except Exception:
-                pass
-            return not self.stop_flag
+    def handle_stop(self):
+        print("Stopping daemon via control socket...")
+        self.request_stop()
+        return {'stopping': True}
 
-        try:
-            self.hotkey_listener = Listener(on_press=on_press, on_release=on_release)
-            self.hotkey_listener.daemon = True
-            self.hotkey_listener.start()
-            print("Global hotkeys enabled")
-        except Exception as e:
-            print(f"Warning: Could not start hotkey listener: {e}")
+    def handle_set_sound(self, args):
+        self.set_sound(require(args, 'sound'))
+        return {'sound': SOUND_TYPES[self.current_sound_index]}
+
+    def handle_set_volume(self, args):
+        self.set_volume(require(args, 'volume'))
+        return {'volume': self.volume, 'effective_volume': self.gain}
+
+    def publish_status(self):
+        """Tell subscribed clients (the GUI) that the state changed"""
+        if self.status_publisher:
+            self.status_publisher.changed()
+
+    def status_event(self):
+        """State pushed to subscribers: only fields that change on real events (no counters)"""
+        device = self.device_status.snapshot()
+        return {
+            'running': not self.stop_flag,
+            'pid': os.getpid(),
+            'sound': SOUND_TYPES[self.current_sound_index],
+            'volume': self.volume,
+            'effective_volume': self.gain,
+            'headphones': self.headphones_connected,
+            'device': {key: device[key] for key in ('headphones', 'reason', 'method')} if device else None,
+            'variants': len(self.sound) if self.sound else 0,
+            'healthy': self.supervisor.healthy(),
+            'workers': {name: worker['state'] for name, worker in self.supervisor.health().items()},
+        }
+
+    def status(self):
+        """Snapshot of the daemon state for status queries"""
+        return {
+            'running': not self.stop_flag,
+            'pid': os.getpid(),
+            'uptime_s': round(time.monotonic() - self.started_at, 1),
+            'sound': SOUND_TYPES[self.current_sound_index],
+            'volume': self.volume,
+            'device_multiplier': self.volume_multiplier,
+            'headphones': self.headphones_connected,
+            'device': self.device_status.snapshot(),
+            'device_monitor': self.device_monitor.mode if self.device_monitor else None,
+            'effective_volume': self.gain,
+            'variants': len(self.sound) if self.sound else 0,
+            'release_sounds': self.release_sound is not None,
+            'sound_bank': self.bank.stats() if self.bank else None,
+            'audio_output': type(self.audio_output).__name__ if self.audio_output else None,
+            'audio_format': {'rate': self.engine.sample_rate, 'channels': self.engine.channels},
+            'notifications': self.notifier.stats(),
+            'subscribers': len(self.status_publisher.subscribers) if self.status_publisher else 0,
+            'healthy': self.supervisor.healthy(),
+            'workers': self.supervisor.health(),
+            'stats': {
+                'events': self.engine.events,
+                'events_coalesced': self.events_coalesced,
+                'queue_overflows': self.event_queue.overflows,
+            },
+        }
+
+    def process_input_events(self):
+        """Audio worker: drain input events, coalesce bursts and trigger voices"""
+        window = self.config.get('coalesce_window_ms', 1.0) / 1000.0
+        last_press = last_release = float('-inf')
+
+        while not self.stop_flag:
+            if not self.event_queue.wait():
+                continue
+            event = self.event_queue.pop()
+            while event is not None:
+                kind, key, timestamp = event
+                if kind == INPUT_RESET:
+                    # Modifiers held when the old listener died never see their release
+                    self.hotkeys.reset()
+                    event = self.event_queue.pop()
+                    continue
+                if self.latency.enabled:
+                    self.latency.record(STAGE_QUEUE, timestamp)
+                # Errors propagate to the supervisor, which restarts this loop
+                if kind == KEY_PRESS:
+                    action = self.hotkeys.press(key)
+                    if action is not None:
+                        self.command_queue.put(getattr(self, action))
+                    # Events piled up within one window (stalls, bursts) sound once
+                    if timestamp - last_press < window:
+                        self.events_coalesced += 1
+                    else:
+                        last_press = timestamp
+                        self.play_sound(timestamp)
+                else:
+                    self.hotkeys.release(key)
+                    if timestamp - last_release < window:
+                        self.events_coalesced += 1
+                    else:
+                        last_release = timestamp
+                        self.play_release_sound(timestamp)
+                event = self.event_queue.pop()
+
+    def build_hotkeys(self):
+        """Compile the configured hotkey bindings (only the audio worker feeds them)"""
+        bindings = dict(DEFAULT_HOTKEYS)
+        overrides = self.config.get('hotkeys') or {}
+        if not isinstance(overrides, dict):
+            print(f"Error: 'hotkeys' must map actions to key combinations, got {overrides!r}; using the defaults")
+            overrides = {}
+        bindings.update({action: spec for action, spec in overrides.items() if action in DEFAULT_HOTKEYS})
+        dispatcher = HotkeyDispatcher(bindings)
+        for error in dispatcher.errors:
+            print(f"Warning: {error}")
+        return dispatcher
 
-    def is_hotkey_pressed(self, key_combination):
-        """Check if a specific hotkey combination is pressed"""
-        return all(key in self.pressed_keys for key in key_combination)
+    def process_commands(self):
+        """Command worker: run hotkey actions away from the input and audio threads"""
+        while True:
+            command = self.command_queue.get()
+            if command is None:
+                break
+            command()  # a failing action crashes the worker: the supervisor logs and restarts it
 
     def start_daemon(self):
         """Handle daemon start hotkey (placeholder - daemon is already running)"""
-        try:
-            subprocess.run([
-                'notify-send', 
-                'enx-kebord daemon', 
-                'Already running',
-                '-t', '1000'
-            ], check=False, timeout=5)
-        except:
-            pass
+        self.notifier.notify('enx-kebord daemon', 'Already running', 1000, key='daemon')
 
     def stop_daemon(self):
         """Handle daemon stop hotkey"""
         print("Stopping daemon via hotkey...")
-        self.stop_flag = True
-        try:
-            subprocess.run([
-                'notify-send', 
-                'enx-kebord daemon', 
-                'Stopping daemon...',
-                '-t', '1000'
-            ], check=False, timeout=5)
-        except:
-            pass
+        self.request_stop()
+        self.notifier.notify('enx-kebord daemon', 'Stopping daemon...', 1000, key='daemon')
 
-    def play_sound(self):
+    def play_sound(self, timestamp=None):
         """Play the sound"""
-        if self.stop_flag or not self.sound:
+        if self.stop_flag or self.sound is None:
             return
 
         try:
-            self.sound.play()
+            self.engine.trigger(self.sound.pick(), self.gain, timestamp)
+        except Exception:
+            pass  # Silently ignore audio errors
+
+    def play_release_sound(self, timestamp=None):
+        """Play the upstroke sound (same cost as the press path)"""
+        if self.stop_flag or self.release_sound is None:
+            return
+
+        try:
+            self.engine.trigger(self.release_sound.pick(), self.gain, timestamp)
         except Exception:
             pass  # Silently ignore audio errors
 
     def on_press(self, key):
-        """Handle key press - play sound"""
-        if not self.stop_flag:
-            self.play_sound()
+        """Handle key press - timestamp it and hand it to the audio worker"""
+        self.event_queue.push(KEY_PRESS, key, time.perf_counter())
         return not self.stop_flag  # Continue listening unless stopped
 
     def on_release(self, key):
-        """Handle key release - no special actions needed"""
+        """Handle key release - timestamp it and hand it to the audio worker"""
+        self.event_queue.push(KEY_RELEASE, key, time.perf_counter())
         return not self.stop_flag  # Continue listening unless stopped
 
+    def latency_report(self):
+        """Latency/jitter histograms per stage plus voice and queue counters"""
+        report = self.latency.report()
+        report['engine'] = self.engine.latency_stats()
+        report['input'] = {
+            'events_coalesced': self.events_coalesced,
+            'queue_overflows': self.event_queue.overflows,
+        }
+        return report
+
+    def dump_latency(self, path=LATENCY_FILE):
+        """Write the latency report to a JSON file"""
+        try:
+            self.latency.dump(path, {
+                'engine': self.engine.latency_stats(),
+                'input': self.latency_report()['input'],
+            })
+            print(f"Latency report written to {path}")
+        except IOError as e:
+            print(f"Could not write latency report: {e}")
+
+    def set_latency_recording(self, enabled):
+        """Switch latency recording on or off at runtime"""
+        self.latency.enabled = bool(enabled)
+
+    def latency_signal_handler(self, signum, frame):
+        """SIGUSR1: dump latency histograms without stopping"""
+        self.dump_latency()
+
     def signal_handler(self, signum, frame):
         """Handle termination signals"""
         print(f"Received signal {signum}, stopping daemon...")
+        self.request_stop()
+
+    def request_stop(self):
+        """Stop the daemon from any thread; the main loop wakes immediately"""
         self.stop_flag = True
+        self.event_queue.wake()
+        self.wake_main_loop()
+
+    def wake_main_loop(self):
+        try:
+            os.write(self.wakeup_write, b'\0')
+        except (BlockingIOError, OSError):
+            pass  # Pipe full: a wakeup is already pending
+
+    def finish_profile(self, timeout=5.0):
+        """--profile-startup: wait briefly for background startup work, report, stop"""
+        deadline = time.monotonic() + timeout
+        expected = {'variants rendered'} if self.rendering else set()
+        if self.config.get('device_monitor', True):
+            expected.add('device probe')
+        while not expected <= set(self.profiler.background) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        print(self.profiler.report())
+        self.request_stop()
+
+    def on_worker_failed(self, worker):
+        """Supervisor gave up on a critical worker: stop rather than run silently"""
+        print(f"Critical worker {worker.name} failed, stopping daemon")
+        self.publish_status()
+        self.request_stop()
+
+    def watch_input_source(self):
+        """Input listener worker: (re)start capture and block until it exits (join, no polling)
+
+        The first start happens in run(), so a listener that can't start
+        fails startup. An exit while the daemon runs is raised: the
+        supervisor restarts the listener with backoff and stops the daemon
+        once it gives up.
+        """
+        if not self.input_started:
+            self.input_source.start(self.on_press, self.on_release)
+            self.input_started = True
+        try:
+            self.input_source.wait()  # pynput re-raises what killed the listener
+        finally:
+            self.input_started = False
+            if not self.stop_flag:
+                self.queue_input_reset()
+        if not self.stop_flag:
+            raise RuntimeError("Keyboard listener exited")
+
+    def queue_input_reset(self):
+        """Tell the audio worker to forget held keys before the restarted listener's events"""
+        # The old listener is gone, so this thread is the queue's only producer;
+        # the marker waits for room rather than being dropped
+        while len(self.event_queue) >= self.event_queue.capacity and not self.stop_flag:
+            time.sleep(0.01)
+        self.event_queue.push(INPUT_RESET, None, time.perf_counter())
         
     def cleanup(self):
         """Clean up resources"""
         print("Cleaning up daemon resources...")
-        try:
-            pygame.mixer.quit()
-        except:
-            pass
+        self.supervisor.stop()
+        self.event_queue.wake()
+        self.command_queue.put(None)
+        if self.audio_output:
+            self.audio_output.close()
+
+        stats = self.engine.latency_stats()
+        if 'p50_ms' in stats:
+            print(f"Trigger-to-first-sample latency: p50 {stats['p50_ms']:.2f} ms, "
+                  f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms "
+                  f"(+{stats['output_buffer_ms']:.2f} ms output buffer)")
+        print(f"Voices: {stats['voices_started']} started, {stats['voices_stolen']} stolen, "
+              f"{stats['voices_dropped']} dropped (cap {stats['polyphony']}, {stats['steal_policy']})")
+        print(f"Input events: {self.events_coalesced} coalesced, "
+              f"{self.event_queue.overflows} dropped on a full queue")
+
+        # Stop input capture, device monitoring and the control socket
+        self.input_source.stop()
+        if self.device_monitor:
+            self.device_monitor.stop()
+        self.notifier.close()
+        if self.status_publisher:
+            self.status_publisher.stop()
+        if self.control_server:
+            self.control_server.stop()
+        if threading.current_thread() is threading.main_thread():
+            signal.set_wakeup_fd(-1)
         
-        # Stop hotkey listener
-        if self.hotkey_listener:
+        # Remove PID file
+        if self.write_pid:
             try:
-                self.hotkey_listener.stop()
+                if PID_FILE.exists():
+                    PID_FILE.unlink()
             except:
                 pass
-        
-        # Remove PID file
+        self.notify_ready(False)
+        if self.instance_lock:
+            self.instance_lock.release()
+
+    def notify_ready(self, ready=True):
+        """Acknowledge startup to the control CLI through its readiness pipe"""
+        fd = os.environ.pop(READY_FD_ENV, None)
+        if fd is None:
+            return
         try:
-            if PID_FILE.exists():
-                PID_FILE.unlink()
-        except:
+            if ready:
+                os.write(int(fd), b"ready\n")
+            os.close(int(fd))  # closing without "ready" reports a failed start
+        except (OSError, ValueError):
             pass
 
     def run(self):
         """Main daemon loop"""
         print("Starting enx-kebord daemon...")
         print(f"Current sound: {SOUND_TYPES[self.current_sound_index]}")
-        print("Global hotkeys: Ctrl+Shift+S (cycle), Shift+↑ (start), Shift+↓ (stop)")
+        labels = self.hotkeys.describe()
+        print("Global hotkeys: " + ", ".join(f"{labels[action]} ({action.split('_')[0]})"
+                                             for action in DEFAULT_HOTKEYS if action in labels))
         
-        # Set up signal handlers for graceful shutdown
-        signal.signal(signal.SIGTERM, self.signal_handler)
-        signal.signal(signal.SIGINT, self.signal_handler)
+        # Set up signal handlers for graceful shutdown (main thread only;
+        # benchmarks drive run() from a worker thread)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.signal_handler)
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGUSR1, self.latency_signal_handler)
+            # Signals write to the wakeup pipe so the blocked main loop returns
+            signal.set_wakeup_fd(self.wakeup_write)
 
         try:
-            with keyboard.Listener(
-                on_press=self.on_press,
-                on_release=self.on_release) as listener:
-                
-                # Keep the daemon running
-                while not self.stop_flag:
-                    time.sleep(0.1)
-                    
+            # A profiling run may sit next to a live daemon: it takes neither
+            # the control socket nor the keyboard
+            if self.config.get('control_socket', True) and not self.profiler.enabled:
+                try:
+                    self.status_publisher = StatusPublisher(self.status_event)
+                    self.control_server = ControlServer(self.control_handlers(),
+                                                        publisher=self.status_publisher)
+                    self.control_server.start()
+                    self.status_publisher.start()
+                    print(f"Control socket: {self.control_server.path}")
+                except Exception as e:
+                    self.control_server = None
+                    self.status_publisher = None
+                    print(f"Warning: Could not start control socket: {e}")
+            self.profiler.mark('control socket')
+
+            if not self.profiler.enabled:
+                self.input_source.start(self.on_press, self.on_release)
+                self.input_started = True
+                if hasattr(self.input_source, 'wait'):
+                    self.supervisor.spawn('input_listener', self.watch_input_source, critical=True)
+            self.profiler.mark('input listener')
+            self.profiler.ready()
+            self.notify_ready()
+            if self.profiler.enabled:
+                threading.Thread(target=self.finish_profile, daemon=True).start()
+
+            # Sleep until a signal, a stop request or listener exit; no timeouts
+            while not self.stop_flag:
+                select.select([self.wakeup_read], [], [])
+                try:
+                    os.read(self.wakeup_read, 4096)
+                except BlockingIOError:
+                    pass
+
         except Exception as e:
             print(f"Daemon error: {e}")
         finally:
@@ -377,9 +897,19 @@ class KeyboardSoundDaemonEnhanced:
             print("Daemon stopped")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='enx-kebord keyboard sound daemon')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report time per startup phase, then exit (runs beside a live daemon: '
+                             'no instance lock, control socket or keyboard listener)')
+    args = parser.parse_args()
     try:
-        daemon = KeyboardSoundDaemonEnhanced()
+        daemon = KeyboardSoundDaemonEnhanced(profiler=StartupProfiler(enabled=args.profile_startup),
+                                             write_pid=not args.profile_startup,
+                                             single_instance=not args.profile_startup)
         daemon.run()
+    except AlreadyRunningError as e:
+        print(e)
+        sys.exit(0)
     except KeyboardInterrupt:
         print("Daemon stopped by user")
     except Exception as e:
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Keypress-to-sound latency instrumentation for enx-kebord
+Each key event is timestamped in the pynput callback; later stages
+(queue dequeue, voice start, buffer submit) record their delay from that
+origin into rolling HDR-style histograms (log-bucketed, ~3% precision)
+together with a jitter histogram of consecutive-event differences.
+"""
+
+import json
+import time
+
+import numpy as np
+
+# Pipeline stages, measured from the pynput callback timestamp
+STAGE_QUEUE = 'queue'              # audio worker dequeued the event
+STAGE_VOICE_START = 'voice_start'  # mixer started the voice
+STAGE_SUBMIT = 'submit'            # first samples handed to the audio device
+STAGES = (STAGE_QUEUE, STAGE_VOICE_START, STAGE_SUBMIT)
+
+# Histogram layout: values in microseconds, exact below 64 us, then 32
+# sub-buckets per power of two up to ~2^40 us
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+MAX_EXPONENT = 40
+BUCKET_COUNT = SUB_BUCKETS + MAX_EXPONENT * HALF_SUB_BUCKETS
+
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_WINDOW_SLICES = 6
+
+
+def bucket_index(value_us):
+    """Histogram bucket for a non-negative integer microsecond value"""
+    if value_us < SUB_BUCKETS:
+        return value_us if value_us > 0 else 0
+    exponent = value_us.bit_length() - SUB_BUCKET_BITS
+    if exponent > MAX_EXPONENT:
+        return BUCKET_COUNT - 1
+    return exponent * HALF_SUB_BUCKETS + (value_us >> exponent)
+
+
+def bucket_value(index):
+    """Representative (midpoint) microsecond value of a bucket"""
+    if index < SUB_BUCKETS:
+        return float(index)
+    exponent = index // HALF_SUB_BUCKETS - 1
+    mantissa = index % HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+    low = mantissa << exponent
+    return low + ((1 << exponent) - 1) / 2.0
+
+
+class RollingHistogram:
+    """Log-bucketed histogram over a sliding time window made of slices"""
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, slices=DEFAULT_WINDOW_SLICES):
+        self.slice_seconds = window_seconds / float(slices)
+        self._counts = np.zeros((slices, BUCKET_COUNT), dtype=np.int64)
+        self._maxima = np.zeros(slices, dtype=np.int64)
+        self._slice_id = int(time.monotonic() / self.slice_seconds)
+
+    def _rotate(self, now):
+        slice_id = int(now / self.slice_seconds)
+        if slice_id == self._slice_id:
+            return
+        slices = len(self._counts)
+        # Clear every slice we skipped over (at most the whole window)
+        for step in range(1, min(slice_id - self._slice_id, slices) + 1):
+            row = (self._slice_id + step) % slices
+            self._counts[row] = 0
+            self._maxima[row] = 0
+        self._slice_id = slice_id
+
+    def record(self, value_us, now):
+        """Add one microsecond value"""
+        self._rotate(now)
+        row = self._slice_id % len(self._counts)
+        self._counts[row, bucket_index(value_us)] += 1
+        if value_us > self._maxima[row]:
+            self._maxima[row] = value_us
+
+    def summary(self, now=None):
+        """Count, mean, p50/p90/p99/p99.9 and max in milliseconds over the window"""
+        self._rotate(time.monotonic() if now is None else now)
+        counts = self._counts.sum(axis=0)
+        total = int(counts.sum())
+        if not total:
+            return {'count': 0}
+        values = np.array([bucket_value(i) for i in range(BUCKET_COUNT)])
+        cumulative = np.cumsum(counts)
+        maximum = float(self._maxima.max())
+
+        def percentile(fraction):
+            # Bucket midpoints can overshoot the exact maximum in the top bucket
+            index = int(np.searchsorted(cumulative, fraction * total))
+            return min(values[min(index, BUCKET_COUNT - 1)], maximum) / 1000.0
+
+        return {
+            'count': total,
+            'mean_ms': float((counts * values).sum() / total / 1000.0),
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'p999_ms': percentile(0.999),
+            'max_ms': maximum / 1000.0,
+        }
+
+    def reset(self):
+        self._counts[:] = 0
+        self._maxima[:] = 0
+
+
+class LatencyRecorder:
+    """Per-stage latency and jitter histograms; recording can be switched off"""
+
+    def __init__(self, enabled=True, window_seconds=DEFAULT_WINDOW_SECONDS,
+                 slices=DEFAULT_WINDOW_SLICES):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self._latency = {stage: RollingHistogram(window_seconds, slices) for stage in STAGES}
+        self._jitter = {stage: RollingHistogram(window_seconds, slices) for stage in STAGES}
+        self._previous = {stage: None for stage in STAGES}
+
+    def record(self, stage, origin, now=None):
+        """Record now - origin (perf_counter seconds) for a stage"""
+        if not self.enabled:
+            return
+        if now is None:
+            now = time.perf_counter()
+        value_us = int((now - origin) * 1e6)
+        if value_us < 0:
+            value_us = 0
+        monotonic = time.monotonic()
+        self._latency[stage].record(value_us, monotonic)
+        previous = self._previous[stage]
+        if previous is not None:
+            self._jitter[stage].record(abs(value_us - previous), monotonic)
+        self._previous[stage] = value_us
+
+    def stage_summary(self, stage):
+        """Latency summary for one stage (empty dict entries if nothing recorded)"""
+        return self._latency[stage].summary()
+
+    def report(self):
+        """Latency and jitter summaries for every stage"""
+        return {
+            'enabled': self.enabled,
+            'window_seconds': self.window_seconds,
+            'stages': {
+                stage: {
+                    'latency': self._latency[stage].summary(),
+                    'jitter': self._jitter[stage].summary(),
+                }
+                for stage in STAGES
+            },
+        }
+
+    def dump(self, path, extra=None):
+        """Write the report (plus optional extra fields) to a JSON file"""
+        report = self.report()
+        report['timestamp'] = time.time()
+        if extra:
+            report.update(extra)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def reset(self):
+        for stage in STAGES:
+            self._latency[stage].reset()
+            self._jitter[stage].reset()
+            self._previous[stage] = None
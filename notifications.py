@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Desktop notifications for enx-kebord
+Hotkey actions hand notifications to a background worker instead of
+forking notify-send inline. The worker keeps a bounded queue, coalesces
+notifications that share a key (cycling through ten sounds shows only
+the last one) and talks to org.freedesktop.Notifications over one
+persistent D-Bus connection when jeepney or dbus-python is available,
+replacing the previous bubble of the same key. notify-send is the
+fallback.
+"""
+
+import subprocess
+import threading
+from collections import OrderedDict
+
+APP_NAME = 'enx-kebord'
+DEFAULT_CAPACITY = 8
+DEFAULT_TIMEOUT_MS = 2000
+SEND_TIMEOUT = 2.0
+
+NOTIFY_BUS_NAME = 'org.freedesktop.Notifications'
+NOTIFY_PATH = '/org/freedesktop/Notifications'
+
+
+class JeepneyBackend:
+    """Notify over a persistent session bus connection (jeepney)"""
+
+    name = 'dbus (jeepney)'
+
+    def __init__(self):
+        from jeepney import DBusAddress, new_method_call
+        from jeepney.io.blocking import open_dbus_connection
+        self._new_method_call = new_method_call
+        self._address = DBusAddress(NOTIFY_PATH, bus_name=NOTIFY_BUS_NAME, interface=NOTIFY_BUS_NAME)
+        self._connection = open_dbus_connection(bus='SESSION')
+
+    def send(self, app_name, replaces_id, summary, body, timeout_ms):
+        message = self._new_method_call(self._address, 'Notify', 'susssasa{sv}i',
+                                        (app_name, replaces_id, '', summary, body, [], {}, timeout_ms))
+        reply = self._connection.send_and_get_reply(message, timeout=SEND_TIMEOUT)
+        return reply.body[0]
+
+    def close(self):
+        self._connection.close()
+
+
+class DBusPythonBackend:
+    """Notify over a persistent session bus connection (dbus-python)"""
+
+    name = 'dbus (dbus-python)'
+
+    def __init__(self):
+        import dbus
+        self._bus = dbus.SessionBus(private=True)
+        proxy = self._bus.get_object(NOTIFY_BUS_NAME, NOTIFY_PATH)
+        self._interface = dbus.Interface(proxy, NOTIFY_BUS_NAME)
+
+    def send(self, app_name, replaces_id, summary, body, timeout_ms):
+        return int(self._interface.Notify(app_name, replaces_id, '', summary, body, [], {}, timeout_ms,
+                                          timeout=SEND_TIMEOUT))
+
+    def close(self):
+        self._bus.close()
+
+
+class NotifySendBackend:
+    """Fork notify-send per notification (no D-Bus bindings installed)"""
+
+    name = 'notify-send'
+
+    def send(self, app_name, replaces_id, summary, body, timeout_ms):
+        subprocess.run(['notify-send', '-a', app_name, summary, body, '-t', str(timeout_ms)],
+                       check=False, timeout=5, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return 0
+
+    def close(self):
+        pass
+
+
+def open_backend():
+    """Best available notification backend"""
+    for backend in (JeepneyBackend, DBusPythonBackend):
+        try:
+            return backend()
+        except Exception:
+            continue
+    return NotifySendBackend()
+
+
+class Notifier:
+    """Background notification worker with a bounded, coalescing queue"""
+
+    def __init__(self, app_name=APP_NAME, capacity=DEFAULT_CAPACITY, enabled=True):
+        self.app_name = app_name
+        self.capacity = capacity
+        self.enabled = enabled
+        self.backend = None
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending = OrderedDict()  # key -> (summary, body, timeout_ms)
+        self._replaces = {}            # key -> id of the bubble to replace
+        self._condition = threading.Condition()
+        self._busy = False
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        """Start the worker thread (the backend is opened there, off the caller's path)"""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def notify(self, summary, body='', timeout_ms=DEFAULT_TIMEOUT_MS, key=None):
+        """Queue a notification; never blocks. Returns False if notifications are off"""
+        if not self.enabled or self._stop:
+            return False
+        key = summary if key is None else key
+        with self._condition:
+            if key in self._pending:
+                self.coalesced += 1
+                del self._pending[key]
+            elif len(self._pending) >= self.capacity:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[key] = (summary, body, timeout_ms)
+            self._condition.notify()
+        return True
+
+    def _run(self):
+        self.backend = open_backend()
+        while True:
+            with self._condition:
+                while not self._pending and not self._stop:
+                    self._condition.wait()
+                if not self._pending:
+                    break
+                key, (summary, body, timeout_ms) = self._pending.popitem(last=False)
+                self._busy = True
+            try:
+                self._replaces[key] = self.backend.send(self.app_name, self._replaces.get(key, 0),
+                                                        summary, body, timeout_ms)
+                self.sent += 1
+            except FileNotFoundError:
+                # No notify-send either: stop queueing notifications
+                self.failed += 1
+                self.enabled = False
+            except Exception:
+                self.failed += 1
+                if not isinstance(self.backend, NotifySendBackend):
+                    # Bus connection lost: fall back rather than retrying a dead socket
+                    try:
+                        self.backend.close()
+                    except Exception:
+                        pass
+                    self.backend = NotifySendBackend()
+                    self._replaces.clear()
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+        try:
+            self.backend.close()
+        except Exception:
+            pass
+
+    def flush(self, timeout=SEND_TIMEOUT):
+        """Wait until queued notifications are sent (bounded by timeout)"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=SEND_TIMEOUT):
+        """Deliver what is queued, then stop the worker"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        with self._condition:
+            self._stop = True
+            self._pending.clear()
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'backend': self.backend.name if self.backend else None,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Sound bank for enx-kebord
+Every sound - all press and release variants of every profile - lives in
+one contiguous float32 buffer. Each sound is a list of views into it with
+a ready-made VariantPool, so switching sounds is a dict lookup and a
+reference swap: no disk I/O, no decoding and no allocation on the
+interactive path, and the memory footprint is fixed once the bank is
+built (SoundBank.nbytes).
+
+A bank can be saved as one packed file and mapped back with mmap:
+
+  header   magic, version, entry count, index offset, data offset
+  index    one 64-byte record per variant: name, variant number, channels,
+           rate, byte offset, length in frames, loudness (RMS dBFS)
+  data     float32 little-endian samples, each variant 64-byte aligned,
+           the block page aligned
+
+Opening a bank file parses nothing but the header and index; the samples
+are used in place from the mapping, so several processes share the pages.
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from audio_engine import VariantPool
+
+BANK_MAGIC = b'ENXBANK\0'
+BANK_VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')  # magic, version, entries, index offset, data offset
+INDEX_DTYPE = np.dtype([
+    ('name', 'S32'),
+    ('variant', '<u2'),
+    ('channels', '<u2'),
+    ('rate', '<u4'),
+    ('offset', '<u8'),    # bytes from the start of the file
+    ('frames', '<u8'),
+    ('loudness', '<f4'),  # RMS in dBFS
+    ('reserved', '<u4'),
+])
+NAME_BYTES = INDEX_DTYPE['name'].itemsize
+SAMPLE_ALIGN = 16   # samples (64 bytes) between variant starts
+DATA_ALIGN = mmap.PAGESIZE
+
+
+def release_name(sound_type):
+    """Bank name of a sound type's upstroke samples"""
+    return f"{sound_type}_release"
+
+
+def bank_path(directory, sample_rate):
+    """Bank file the generator writes for one sample rate"""
+    return Path(directory) / f"keyboard_{sample_rate}hz.bank"
+
+
+def _align(value, alignment):
+    return -(-value // alignment) * alignment
+
+
+def loudness_db(samples):
+    """RMS level of a buffer in dBFS"""
+    if len(samples) == 0:
+        return -np.inf
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    return 20.0 * np.log10(rms) if rms > 0 else -np.inf
+
+
+class SoundBank:
+    """All sounds in one contiguous buffer, with per-sound variant views"""
+
+    def __init__(self, buffer, index, sample_rate, selection='random', seed=None, loudness=None):
+        """
+        buffer: 1-D float32 array (in memory or a view of a mapped bank file)
+        index: name -> [(start, length), ...] in samples into buffer
+        loudness: name -> [dBFS per variant], computed when missing
+        """
+        self.buffer = buffer
+        self.index = index
+        self.sample_rate = sample_rate
+        self.loudness = loudness
+        self.path = None  # set for banks mapped from a file
+        self.pools = {}   # name -> VariantPool over views of buffer
+        for name, entries in index.items():
+            views = [buffer[start:start + length] for start, length in entries]
+            self.pools[name] = VariantPool(views, selection, seed)
+
+    @classmethod
+    def from_sounds(cls, sounds, sample_rate, selection='random', seed=None):
+        """Pack name -> list of mono float32 variants (empty lists are skipped)"""
+        sounds = {name: variants for name, variants in sounds.items() if variants}
+        total = sum(_align(len(v), SAMPLE_ALIGN) for variants in sounds.values() for v in variants)
+        buffer = np.zeros(total, dtype=np.float32)
+        index = {}
+        start = 0
+        for name, variants in sounds.items():
+            entries = []
+            for variant in variants:
+                buffer[start:start + len(variant)] = variant
+                entries.append((start, len(variant)))
+                start += _align(len(variant), SAMPLE_ALIGN)
+            index[name] = entries
+        return cls(buffer, index, sample_rate, selection, seed)
+
+    @classmethod
+    def open(cls, path, selection='random', seed=None):
+        """Map a bank file read-only; raises ValueError if it isn't a usable bank"""
+        with open(str(path), 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, index_offset, data_offset = HEADER.unpack_from(mapping, 0)
+        except struct.error:
+            raise ValueError(f"{path} is not an enx-kebord sound bank")
+        if magic != BANK_MAGIC:
+            raise ValueError(f"{path} is not an enx-kebord sound bank")
+        if version != BANK_VERSION:
+            raise ValueError(f"{path} has bank format version {version}, expected {BANK_VERSION}")
+
+        if index_offset + count * INDEX_DTYPE.itemsize > len(mapping) or data_offset > len(mapping):
+            raise ValueError(f"{path} is truncated")
+        records = np.frombuffer(mapping, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        rates = set(records['rate'].tolist())
+        if len(rates) > 1 or np.any(records['channels'] != 1):
+            raise ValueError(f"{path} mixes rates or holds non-mono sounds")
+        ends = records['offset'] + records['frames'] * records['channels'].astype('<u8') * 4
+        if np.any(records['offset'] < data_offset) or np.any(records['offset'] % 4) \
+                or np.any(ends > len(mapping)):
+            raise ValueError(f"{path} is truncated or its index points outside the sample data")
+        buffer = np.frombuffer(mapping, dtype='<f4', count=(len(mapping) - data_offset) // 4,
+                               offset=data_offset)
+
+        index = {}
+        loudness = {}
+        for record in records:
+            name = record['name'].decode('utf-8')
+            start = (int(record['offset']) - data_offset) // 4
+            index.setdefault(name, []).append((start, int(record['frames'])))
+            loudness.setdefault(name, []).append(float(record['loudness']))
+        bank = cls(buffer, index, rates.pop() if rates else 0, selection, seed, loudness)
+        bank.path = Path(path)
+        return bank
+
+    def save(self, path):
+        """Write the bank as a packed file (atomically, so mapped readers keep the old one)
+
+        Raises ValueError for a sound name longer than the index's name field.
+        """
+        for name in self.index:
+            if len(name.encode('utf-8')) > NAME_BYTES:
+                raise ValueError(f"Sound name {name!r} is longer than {NAME_BYTES} bytes")
+        count = sum(len(entries) for entries in self.index.values())
+        index_offset = HEADER.size
+        data_offset = _align(index_offset + count * INDEX_DTYPE.itemsize, DATA_ALIGN)
+
+        records = np.zeros(count, dtype=INDEX_DTYPE)
+        i = 0
+        for name, entries in self.index.items():
+            for variant, (start, length) in enumerate(entries):
+                loudness = (self.loudness[name][variant] if self.loudness
+                            else loudness_db(self.buffer[start:start + length]))
+                records[i] = (name.encode('utf-8'), variant, 1, self.sample_rate,
+                              data_offset + start * 4, length, loudness, 0)
+                i += 1
+
+        path = Path(path)
+        temporary = path.with_name(f".{path.name}.{os.getpid()}")
+        with open(str(temporary), 'wb') as f:
+            f.write(HEADER.pack(BANK_MAGIC, BANK_VERSION, count, index_offset, data_offset))
+            f.write(records.tobytes())
+            f.write(b'\0' * (data_offset - f.tell()))
+            f.write(np.ascontiguousarray(self.buffer, dtype='<f4').tobytes())
+        os.replace(str(temporary), str(path))
+
+    def __contains__(self, name):
+        return name in self.pools
+
+    def __len__(self):
+        return len(self.pools)
+
+    def pool(self, name):
+        """VariantPool of a sound (None if the bank doesn't have it)"""
+        return self.pools.get(name)
+
+    def variant_count(self, name):
+        return len(self.index.get(name, ()))
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def stats(self):
+        return {
+            'sounds': len(self.pools),
+            'variants': sum(len(entries) for entries in self.index.values()),
+            'bytes': self.nbytes,
+            'sample_rate': self.sample_rate,
+            'file': str(self.path) if self.path else None,
+        }
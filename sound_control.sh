@@ -92,7 +92,7 @@ show_current() {
 list_sounds() {
     echo "🎵 Available sounds:"
     echo ""
-    ls -1 "$GENERATED_DIR"/keyboard_*.wav 2>/dev/null | while read -r file; do
+    ls -1 "$GENERATED_DIR"/keyboard_*.wav 2>/dev/null | grep -v '_release\.wav$' | while read -r file; do
         basename "$file" .wav | sed 's/keyboard_/  • /'
     done
     echo ""
@@ -112,6 +112,11 @@ switch_sound() {
     fi
     
     echo "🎵 Switching to ${sound_type} keyboard sound..."
+    # A running daemon switches in-process from its preloaded sound bank
+    if ./keyboard_sound_control.sh set-sound "$sound_type" > /dev/null 2>&1; then
+        echo "✅ Now using ${sound_type} keyboard sound!"
+        return
+    fi
     cp "$sound_file" key_press.wav
     
     echo "🔄 Restarting daemon..."
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Sample-format negotiation for enx-kebord
+The output format (rate, channels) is negotiated once when audio opens,
+letting the device keep its native rate and layout. Sounds are then
+rendered or converted into exactly that format a single time and cached
+under generated_sounds/.cache, so loading a sound is a plain buffer read:
+no resampling or up-mixing at load time, by SDL or by us.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+from audio_engine import load_wav
+
+CACHE_DIR = Path(__file__).resolve().parent / "generated_sounds" / ".cache"
+GENERATED_RATE = 44100  # rate sound_generator.py writes unless told otherwise
+MIXER_BUFFER = 512
+
+# pygame.mixer sample sizes -> numpy sample types (8-bit mixers load files directly)
+MIXER_DTYPES = {-16: np.int16, 16: np.int16, 32: np.float32}
+
+
+def open_mixer(frequency=GENERATED_RATE, buffer=MIXER_BUFFER):
+    """Open pygame.mixer in the device's native format; returns (rate, size, channels)
+
+    Asks for the generator's rate in mono and lets SDL change both, so
+    whatever comes back is what the device really runs at.
+    """
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', "hide")
+    import pygame
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init(frequency=frequency, size=-16, channels=1, buffer=buffer,
+                          allowedchanges=pygame.AUDIO_ALLOW_FREQUENCY_CHANGE |
+                          pygame.AUDIO_ALLOW_CHANNELS_CHANGE)
+    return pygame.mixer.get_init()
+
+
+def cache_path(path, rate, channels, dtype):
+    """Cache file for path converted to (rate, channels, dtype)
+
+    The name carries the source's size and mtime, so regenerating a sound
+    invalidates its cached conversions.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    source = hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]
+    prefix = f"{path.stem}.{source}.{rate}hz.{channels}ch.{np.dtype(dtype).str[1:]}"
+    return CACHE_DIR / f"{prefix}.{stat.st_size:x}-{stat.st_mtime_ns:x}.npy"
+
+
+def converted(path, rate, channels=1, dtype=np.float32):
+    """Samples of a WAV file in the given format, converted once and cached
+
+    Returns a (frames,) array for mono or (frames, channels) otherwise.
+    """
+    target = cache_path(path, rate, channels, dtype)
+    try:
+        return np.load(str(target))
+    except (OSError, ValueError):
+        pass
+
+    samples = load_wav(path, rate)
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    if np.dtype(dtype) == np.int16:
+        samples = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+    else:
+        samples = samples.astype(dtype, copy=False)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Older conversions of the same source/format are stale now
+        stem = target.name.rsplit('.', 2)[0]
+        for stale in CACHE_DIR.glob(f"{stem}.*.npy"):
+            stale.unlink()
+        temporary = target.with_name(f".{target.name}.{os.getpid()}")
+        with open(str(temporary), 'wb') as f:
+            np.save(f, samples)
+        os.replace(str(temporary), str(target))
+    except OSError:
+        pass  # read-only install: convert on every load instead
+    return samples
+
+
+def mixer_sound(path):
+    """pygame Sound for a WAV file, built from a copy already in the mixer's format"""
+    import pygame
+
+    rate, size, channels = pygame.mixer.get_init()
+    dtype = MIXER_DTYPES.get(size)
+    if dtype is None:
+        return pygame.mixer.Sound(str(path))
+    return pygame.mixer.Sound(buffer=converted(path, rate, channels, dtype))
@@ -5,300 +5,632 @@ Creates realistic mechanical keyboard sounds programmatically
 """
 
 # Enforce venv: re-exec with local venv Python if not already using it
+# (only when run as a script, so the daemon can import the generator)
 import os, sys
 from pathlib import Path
 BASE = Path(__file__).resolve().parent
 VENV_PY = BASE / 'venv' / 'bin' / 'python3'
-if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+if __name__ == "__main__" and VENV_PY.exists() and Path(sys.executable) != VENV_PY:
     os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
 
 import numpy as np
 import wave
 import argparse
+import hashlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from sound_bank import SoundBank, bank_path, release_name
+
+SOUND_TYPES = ['blue', 'brown', 'red', 'mechanical', 'typewriter', 'creamy', 'dry', 'thock', 'clicky',
+               'silent', 'tactile', 'lofi', 'gx_feryn', 'lee_sin', 'hacker', 'hard']
+DEFAULT_VARIANTS = 8
+VARIANT_PITCH_JITTER = 0.02  # relative std-dev of the base frequency per variant
+DEFAULT_DECAY_FLOOR_DB = -90.0  # a decaying component is cut off this far below its start level
+DEFAULT_SEED = 0
+# Part of every render cache key: bump it whenever a change to the synthesis
+# code (rather than to the profile tables) changes what gets rendered
+GENERATOR_VERSION = 1
+DEFAULT_CACHE_MB = 64  # render cache size cap; least recently used renders go first
+
+# Upstroke (key release) character per profile:
+# (top-housing impact frequency, decay rate, level relative to the press, noise amount)
+RELEASE_PROFILES = {
+    'blue': (1700, 90, 0.55, 0.08),
+    'brown': (1100, 80, 0.40, 0.05),
+    'red': (900, 70, 0.30, 0.03),
+    'mechanical': (1500, 60, 0.60, 0.10),
+    'typewriter': (1200, 40, 0.45, 0.04),
+    'creamy': (700, 60, 0.30, 0.02),
+    'dry': (1600, 80, 0.45, 0.12),
+    'thock': (450, 45, 0.40, 0.03),
+    'clicky': (2200, 100, 0.60, 0.06),
+    'silent': (600, 70, 0.15, 0.02),
+    'tactile': (1000, 75, 0.40, 0.04),
+    'lofi': (550, 35, 0.35, 0.02),
+    'gx_feryn': (1300, 70, 0.40, 0.04),
+    'lee_sin': (1800, 90, 0.50, 0.05),
+    'hacker': (1400, 80, 0.45, 0.06),
+    'hard': (2000, 100, 0.70, 0.12),
+}
+
+# Press envelope modulations (creamy wobble, tactile bump)
+MODULATIONS = {
+    'wobble': lambda t: 1.0 + 0.1 * np.sin(t * 30.0),
+    'bump': lambda t: 1.0 + 0.8 * np.exp(-np.square((t - 0.01) / 0.005)),
+}
+
+
+class Tone:
+    """Damped sine: amp * exp(-decay*t) * (1 - exp(-attack*t)) * sin(2*pi*f*t) for start <= t < end
+
+    freq is in Hz, drawn per variant around it with std-dev spread, or with
+    relative=True a multiple of each variant's base frequency.
+    """
+
+    def __init__(self, freq, spread=0.0, decay=0.0, amp=1.0, start=0.0, end=None,
+                 attack=None, relative=False, modulation=None):
+        self.freq = freq
+        self.spread = spread
+        self.relative = relative
+        self.shape = (amp, decay, attack, modulation, start, end)
+
+    def frequencies(self, base, rng):
+        """Per-variant frequencies, shape (K, 1)"""
+        if self.relative:
+            freqs = base * self.freq
+        elif self.spread:
+            freqs = self.freq + rng.normal(0.0, self.spread, len(base))
+        else:
+            freqs = np.full(len(base), self.freq)
+        return freqs.astype(np.float32)[:, None]
+
+    def render(self, acc, scratch, omega_t, base, rng, shapes):
+        """Add the tone to acc over its support; returns the end of that support"""
+        first, last, shape = shapes.get(self.shape)
+        if first >= last:
+            return 0
+        out = _rows(scratch, len(base), last - first)
+        np.multiply(self.frequencies(base, rng), omega_t[first:last], out=out)
+        np.sin(out, out=out)
+        out *= shape
+        acc[:, first:last] += out
+        return last
+
+
+class Noise:
+    """Shaped noise ('normal' std-dev, 'uniform' +/- or 'steps' of -scale/0/+scale) per variant"""
+
+    def __init__(self, kind, scale, decay=0.0, amp=1.0, start=0.0, end=None, attack=None):
+        self.kind = kind
+        self.scale = scale
+        self.shape = (amp * scale, decay, attack, None, start, end)
+
+    def render(self, acc, scratch, omega_t, base, rng, shapes):
+        """Add the noise to acc over its support; returns the end of that support"""
+        first, last, shape = shapes.get(self.shape)
+        if first >= last:
+            return 0
+        out = _rows(scratch, len(base), last - first)
+        if self.kind == 'normal':
+            rng.standard_normal(out=out, dtype=np.float32)
+        elif self.kind == 'uniform':
+            rng.random(out=out, dtype=np.float32)
+            out -= 0.5
+            out *= 2.0
+        else:
+            out[:] = rng.integers(-1, 2, size=out.shape)
+        out *= shape
+        acc[:, first:last] += out
+        return last
+
+
+def _rows(scratch, rows, length):
+    """Contiguous (rows, length) view at the start of a flat scratch buffer"""
+    return scratch[:rows * length].reshape(rows, length)
+
+
+class ShapeCache:
+    """Amplitude envelopes (amp, decay, attack, modulation, window) over their support
+
+    get() returns (first, last, shape): the sample range a component is
+    audible in - its window, ended early where the decay has fallen
+    floor_db below its level at the window start - and the envelope over
+    just that range, so nothing outside it is ever computed.
+    """
+
+    def __init__(self, t, floor_db=DEFAULT_DECAY_FLOOR_DB):
+        self.t = t
+        self.floor_decades = None if floor_db is None else -floor_db / 20.0
+        self._shapes = {}
+
+    def support(self, decay, start, end):
+        """Sample range [first, last) of a component"""
+        stop = np.inf if end is None else end
+        if decay > 0 and self.floor_decades is not None:
+            stop = min(stop, start + self.floor_decades * np.log(10.0) / decay)
+        first = int(np.searchsorted(self.t, np.float32(start)))
+        return first, int(np.searchsorted(self.t, np.float32(stop)))
+
+    def get(self, key):
+        entry = self._shapes.get(key)
+        if entry is None:
+            amp, decay, attack, modulation, start, end = key
+            first, last = self.support(decay, start, end)
+            t = self.t[first:last]
+            shape = np.exp(-t * np.float32(decay))
+            if attack is not None:
+                shape *= 1.0 - np.exp(-t * np.float32(attack))
+            if modulation is not None:
+                shape *= MODULATIONS[modulation](t)
+            shape *= np.float32(amp)
+            self._shapes[key] = entry = (first, last, shape.astype(np.float32, copy=False))
+        return entry
+
+
+def _partials(partials, decay, attack, modulation=None):
+    """Harmonics of the base frequency sharing one envelope: [(multiple, amp), ...]"""
+    return [Tone(multiple, amp=amp, decay=decay, attack=attack, relative=True, modulation=modulation)
+            for multiple, amp in partials]
+
+
+class Profile:
+    """Components summed into a press sound, plus optional tape saturation (drive, level)"""
+
+    def __init__(self, components, saturate=None):
+        self.components = components
+        self.saturate = saturate
+
+
+PRESS_PROFILES = {
+    # Cherry MX Blue: plastic impact, spring click, housing resonance, friction noise
+    'blue': Profile([
+        Tone(2000, 200, decay=80, amp=0.6, end=0.005),
+        Tone(800, 50, decay=40, amp=0.8, end=0.01),
+        Tone(300, 30, decay=12, amp=0.3),
+        Noise('normal', 0.1, decay=25, amp=0.2, end=0.02),
+    ]),
+    # Cherry MX Brown: soft tactile bump, stem slide, bottom out, subtle friction
+    'brown': Profile([
+        Tone(1200, 100, decay=60, amp=0.7, end=0.008),
+        Tone(600, 40, decay=20, amp=0.4),
+        Tone(400, 50, decay=30, amp=0.5, start=0.02, end=0.035),
+        Noise('normal', 0.05, decay=20, amp=0.15),
+    ]),
+    # Cherry MX Red: linear stem movement, muffled bottom out
+    'red': Profile([
+        Tone(500, 30, decay=15, amp=0.4),
+        Tone(350, 40, decay=40, amp=0.6, start=0.025, end=0.04),
+        Noise('normal', 0.03, decay=18, amp=0.1),
+    ]),
+    # Buckling spring (IBM Model M): spring, metal contact, keycap, plate, noise
+    'mechanical': Profile([
+        Tone(1800, 150, decay=50, amp=0.8, end=0.012),
+        Tone(3000, 300, decay=100, amp=0.4, end=0.003),
+        Tone(800, 80, decay=25, amp=0.6),
+        Tone(200, 20, decay=8, amp=0.3),
+        Noise('normal', 0.15, decay=30, amp=0.3),
+    ]),
+    # Vintage typewriter with a metallic ping
+    'typewriter': Profile(_partials([(0.5, 1.0)], 20, 100) + [
+        Tone(4, amp=0.3, decay=50, relative=True),
+    ]),
+    # Lubed, smooth switches
+    'creamy': Profile(_partials([(0.9, 1.0), (1.5, 0.4), (2.2, 0.2)], 8, 20, 'wobble')),
+    # Unlubricated, scratchy switches
+    'dry': Profile([
+        Tone(1500, 200, decay=35, amp=0.6),
+        Noise('uniform', 0.2, decay=40, amp=0.4),
+        Noise('uniform', 0.1, decay=25, amp=0.3),
+        Tone(2500, 300, decay=90, amp=0.7, end=0.004),
+        Tone(700, 70, decay=20, amp=0.4),
+    ]),
+    # Deep Topre-style thock: impact, dome, wooden case, muffled highs
+    'thock': Profile([
+        Tone(250, 25, decay=15, amp=0.8),
+        Tone(400, 30, decay=30, amp=0.5, end=0.015),
+        Tone(120, 15, decay=5, amp=0.6),
+        Tone(1000, 100, decay=80, amp=0.2, end=0.005),
+    ]),
+    # Extra clicky (Box Jade/Navy)
+    'clicky': Profile(_partials([(1.4, 1.0)], 20, 80) + [
+        Tone(4, amp=0.6, decay=100, end=0.02, relative=True),
+        Tone(6, amp=0.4, decay=120, end=0.015, relative=True),
+    ]),
+    # Dampened silent switch
+    'silent': Profile(_partials([(0.7, 0.5), (1.8, 0.05)], 12, 25)),
+    # Pronounced tactile bump on the fundamental
+    'tactile': Profile([
+        Tone(0.85, decay=10, attack=35, relative=True, modulation='bump'),
+        Tone(2.3, amp=0.3, decay=10, attack=35, relative=True),
+    ]),
+    # Warm, muffled lofi with tape saturation
+    'lofi': Profile(_partials([(0.6, 1.0), (1.2, 0.3), (0.8, 0.2), (0.3, 0.05)], 5, 12), saturate=(1.5, 0.7)),
+    # GX Feryn gaming sound with a digital edge
+    'gx_feryn': Profile(_partials([(1.0, 1.0), (2.1, 0.4), (3.3, 0.2)], 10, 30) + [
+        Tone(5, amp=0.1, decay=50, relative=True),
+    ]),
+    # Lee Sin: sharp strike with a resonant echo
+    'lee_sin': Profile(_partials([(1.3, 1.0)], 25, 100) + [
+        Tone(4, amp=0.8, decay=80, end=0.015, relative=True),
+        Tone(1.5, amp=0.2, decay=15, start=0.02, relative=True),
+    ]),
+    # Retro terminal with digital glitches and a beep
+    'hacker': Profile(_partials([(1.1, 1.0), (2.7, 0.4), (4.1, 0.3)], 15, 45) + [
+        Noise('steps', 0.1, decay=15, attack=45, amp=0.3),
+        Tone(6, amp=0.2, decay=60, end=0.01, relative=True),
+    ]),
+    # Extremely hard, aggressive mechanical
+    'hard': Profile([
+        Tone(3500, 400, decay=120, amp=1.0, end=0.003),
+        Tone(1200, 150, decay=60, amp=0.9, end=0.008),
+        Tone(2000, 200, decay=80, amp=0.8, end=0.006),
+        Tone(800, 100, decay=40, amp=0.7, start=0.015, end=0.03),
+        Tone(400, 50, decay=20, amp=0.6),
+        Tone(4000, 500, decay=100, amp=0.5, end=0.004),
+        Noise('uniform', 0.3, decay=50, amp=0.4),
+        Tone(180, 20, decay=12, amp=0.5),
+    ]),
+}
+
+
+def profile_signature(click_type, release=False):
+    """Everything in the profile tables that shapes a press (or release) sound of click_type"""
+    if release:
+        return ('release', click_type, RELEASE_PROFILES.get(click_type))
+    profile = PRESS_PROFILES.get(click_type)
+    if profile is None:
+        return ('press', click_type, None)
+    components = [(type(component).__name__, sorted(vars(component).items()))
+                  for component in profile.components]
+    return ('press', click_type, components, profile.saturate)
+
+
+class RenderCache:
+    """Content-addressed store of rendered sounds: one .npy file per render key
+
+    A file's mtime is its last use, so prune() can drop the least recently
+    used renders once the cache outgrows its cap.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, key):
+        return self.directory / f"{key}.npy"
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            samples = np.load(str(path))
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(str(path))
+        except OSError:
+            pass
+        return samples
+
+    def prune(self, max_bytes, keep_since=None):
+        """Delete least recently used renders until the cache fits in max_bytes
+
+        Renders used at or after keep_since (a time.time() value: the
+        current run's) are kept regardless. Returns the number deleted.
+        """
+        entries = []
+        for path in self.directory.glob('*.npy'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= max_bytes or (keep_since is not None and mtime >= keep_since):
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def put(self, key, samples):
+        target = self.path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary = target.with_name(f".{target.name}.{os.getpid()}")
+            with open(str(temporary), 'wb') as f:
+                np.save(f, samples)
+            os.replace(str(temporary), str(target))
+        except OSError:
+            pass  # read-only output directory: render every time instead
+
+
 class KeyboardSoundGenerator:
-    def __init__(self, sample_rate=44100):
+    def __init__(self, sample_rate=44100, decay_floor_db=DEFAULT_DECAY_FLOOR_DB, seed=None, cache=None):
         self.sample_rate = sample_rate
+        self.decay_floor_db = decay_floor_db  # None renders every decay to the end of the buffer
+        # With a seed every output is a pure function of its render key, and
+        # can then be looked up in cache (a RenderCache) instead of rendered
+        self.seed = seed
+        self.cache = cache
+        self.rendered = 0
+        self.cache_hits = 0
+        self.rng = np.random.default_rng()
+
+    def render_batch(self, click_type, frequencies, duration=0.15, release=False):
+        """Render one variant per base frequency as a (K, N) float32 array
+
+        All variants are computed together: parameters are drawn as arrays,
+        the time axis is broadcast against them and every component is
+        accumulated in place into one (K, N) buffer - over its support
+        only, so the cost follows the audible content rather than the
+        buffer length.
+        """
+        base = np.asarray(frequencies, dtype=np.float64).reshape(-1)
+        t = np.arange(int(self.sample_rate * duration), dtype=np.float32) / np.float32(self.sample_rate)
+        omega_t = t * np.float32(2 * np.pi)
+        acc = np.zeros((len(base), len(t)), dtype=np.float32)
+        if len(t) == 0:
+            return acc
+        scratch = np.empty(acc.size, dtype=np.float32)
+        shapes = ShapeCache(t, self.decay_floor_db)
+
+        if release:
+            active, level = self._render_release(acc, scratch, omega_t, base, click_type, shapes)
+        else:
+            profile = PRESS_PROFILES.get(click_type)
+            if profile is None:
+                raise ValueError(f"Unknown sound type: {click_type}")
+            active = max(component.render(acc, scratch, omega_t, base, self.rng, shapes)
+                         for component in profile.components)
+            if profile.saturate:
+                drive, saturated_level = profile.saturate
+                sound = acc[:, :active]
+                sound *= drive
+                np.tanh(sound, out=sound)
+                sound *= saturated_level
+            level = 1.0
+
+        # Normalize each variant and apply the same subtle compression
+        # (past the last active sample acc is silent and stays silent)
+        sound = acc[:, :active]
+        peak = np.max(np.abs(sound), axis=1, keepdims=True, initial=0.0)
+        np.divide(0.7 * level * 1.2, peak, out=peak, where=peak > 0)
+        sound *= peak
+        np.tanh(sound, out=sound)
+        sound *= 0.8
+        return acc
+
+    def _render_release(self, acc, scratch, omega_t, base, click_type, shapes):
+        """Upstroke: top-housing impact, body resonance and rattle; returns (active samples, level)"""
+        profile = RELEASE_PROFILES.get(click_type)
+        if profile is None:
+            top_freq, decay, level, noise = base * 1.5, 70, 0.4, 0.05
+        else:
+            top_freq, decay, level, noise = profile
+            top_freq = np.full(len(base), float(top_freq))
+        top_freq = (top_freq + self.rng.normal(0.0, 1.0, len(base)) * top_freq * 0.05).astype(np.float32)
+
+        # Stem returning and hitting the top housing, then a short body resonance
+        active = 0
+        for multiple, amp, decay_scale in ((1.0, 1.0, 1.0), (0.35, 0.4, 0.4)):
+            first, last, shape = shapes.get((amp, decay * decay_scale, None, None, 0.0, None))
+            out = _rows(scratch, len(base), last - first)
+            np.multiply((top_freq * np.float32(multiple))[:, None], omega_t[first:last], out=out)
+            np.sin(out, out=out)
+            out *= shape
+            acc[:, first:last] += out
+            active = max(active, last)
+
+        # Spring and slider rattle
+        rattle = Noise('normal', noise, decay=decay * 1.5)
+        active = max(active, rattle.render(acc, scratch, omega_t, base, self.rng, shapes))
+        if click_type == "lofi":
+            sound = acc[:, :active]
+            sound *= 1.5
+            np.tanh(sound, out=sound)
+        return active, level
+
+    def render_key(self, click_type, count, frequency, duration, release=False):
+        """Hash of everything that shapes one output (None without a seed)
+
+        count is the number of jittered variants, or None for a single sound
+        at exactly frequency.
+        """
+        if self.seed is None:
+            return None
+        parts = (GENERATOR_VERSION, profile_signature(click_type, release), self.sample_rate,
+                 self.decay_floor_db, self.seed, count, float(frequency), float(duration))
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    def _render(self, click_type, count, frequency, duration, release):
+        """(K, N) output, taken from the cache or rendered from a key-seeded rng"""
+        key = self.render_key(click_type, count, frequency, duration, release)
+        if key is not None:
+            samples = self.cache.get(key) if self.cache else None
+            if samples is not None:
+                self.cache_hits += 1
+                return samples
+            # Seeded per output, so results don't depend on render order or worker
+            self.rng = np.random.default_rng(int(key[:32], 16))
+
+        if count is None:
+            frequencies = [frequency]
+        else:
+            frequencies = frequency * (1.0 + self.rng.normal(0, VARIANT_PITCH_JITTER, count))
+        samples = self.render_batch(click_type, frequencies, duration, release)
+        self.rendered += 1
+        if key is not None and self.cache:
+            self.cache.put(key, samples)
+        return samples
 
     def generate_click_sound(self, frequency=800, duration=0.1, click_type="blue"):
         """Generate realistic mechanical keyboard sounds"""
-        t = np.linspace(0, duration, int(self.sample_rate * duration), False)
-
-        if click_type == "blue":
-            # Cherry MX Blue - realistic click with plastic impact
-            # Key press impact (plastic hitting plastic)
-            impact_freq = 2000 + np.random.normal(0, 200)
-            impact = np.exp(-t * 80) * np.sin(impact_freq * 2 * np.pi * t) * (t < 0.005)
-
-            # Spring click mechanism
-            spring_freq = 800 + np.random.normal(0, 50)
-            spring_click = np.exp(-t * 40) * np.sin(spring_freq * 2 * np.pi * t) * (t < 0.01)
-
-            # Housing resonance
-            housing_freq = 300 + np.random.normal(0, 30)
-            housing = np.exp(-t * 12) * np.sin(housing_freq * 2 * np.pi * t)
-
-            # Plastic friction noise
-            friction = np.random.normal(0, 0.1, len(t)) * np.exp(-t * 25) * (t < 0.02)
-
-            sound = 0.6 * impact + 0.8 * spring_click + 0.3 * housing + 0.2 * friction
-
-        elif click_type == "brown":
-            # Cherry MX Brown - tactile bump without loud click
-            # Tactile bump impact (softer)
-            bump_freq = 1200 + np.random.normal(0, 100)
-            bump = np.exp(-t * 60) * np.sin(bump_freq * 2 * np.pi * t) * (t < 0.008)
-
-            # Stem sliding in housing
-            slide_freq = 600 + np.random.normal(0, 40)
-            slide = np.exp(-t * 20) * np.sin(slide_freq * 2 * np.pi * t)
-
-            # Bottom out (key hitting bottom)
-            bottom_freq = 400 + np.random.normal(0, 50)
-            bottom = np.exp(-t * 30) * np.sin(bottom_freq * 2 * np.pi * t) * (t > 0.02) * (t < 0.035)
+        return self._render(click_type, None, frequency, duration, False)[0]
 
-            # Subtle friction
-            friction = np.random.normal(0, 0.05, len(t)) * np.exp(-t * 20)
-
-            sound = 0.7 * bump + 0.4 * slide + 0.5 * bottom + 0.15 * friction
-
-        elif click_type == "red":
-            # Cherry MX Red - linear, smooth, quiet
-            # Stem movement (no tactile bump)
-            stem_freq = 500 + np.random.normal(0, 30)
-            stem = np.exp(-t * 15) * np.sin(stem_freq * 2 * np.pi * t)
-
-            # Bottom out impact (muffled)
-            bottom_freq = 350 + np.random.normal(0, 40)
-            bottom = np.exp(-t * 40) * np.sin(bottom_freq * 2 * np.pi * t) * (t > 0.025) * (t < 0.04)
-
-            # Very subtle friction
-            friction = np.random.normal(0, 0.03, len(t)) * np.exp(-t * 18)
-
-            sound = 0.4 * stem + 0.6 * bottom + 0.1 * friction
-
-        elif click_type == "mechanical":
-            # Heavy mechanical keyboard (like IBM Model M buckling spring)
-            # Spring buckling mechanism
-            spring_freq = 1800 + np.random.normal(0, 150)
-            spring = np.exp(-t * 50) * np.sin(spring_freq * 2 * np.pi * t) * (t < 0.012)
-
-            # Metal contact impact
-            metal_freq = 3000 + np.random.normal(0, 300)
-            metal = np.exp(-t * 100) * np.sin(metal_freq * 2 * np.pi * t) * (t < 0.003)
-
-            # Key cap to key cap collision
-            keycap_freq = 800 + np.random.normal(0, 80)
-            keycap = np.exp(-t * 25) * np.sin(keycap_freq * 2 * np.pi * t)
-
-            # Plate resonance
-            plate_freq = 200 + np.random.normal(0, 20)
-            plate = np.exp(-t * 8) * np.sin(plate_freq * 2 * np.pi * t)
-
-            # Mechanical noise
-            mech_noise = np.random.normal(0, 0.15, len(t)) * np.exp(-t * 30)
-
-            sound = 0.8 * spring + 0.4 * metal + 0.6 * keycap + 0.3 * plate + 0.3 * mech_noise
-
-        elif click_type == "typewriter":
-            # Vintage typewriter sound
-            envelope = np.exp(-t * 20) * (1 - np.exp(-t * 100))
-            sound = np.sin(frequency * 0.5 * 2 * np.pi * t) * envelope
-            # Add metallic ping
-            ping = 0.3 * np.sin(frequency * 4 * 2 * np.pi * t) * np.exp(-t * 50)
-            sound += ping
-
-        elif click_type == "creamy":
-            # Creamy smooth click (like lubed switches)
-            envelope = np.exp(-t * 8) * (1 - np.exp(-t * 20)) * (1 + 0.1 * np.sin(t * 30))
-            sound = np.sin(frequency * 0.9 * 2 * np.pi * t) * envelope
-            # Add smooth harmonics
-            sound += 0.4 * np.sin(frequency * 1.5 * 2 * np.pi * t) * envelope
-            sound += 0.2 * np.sin(frequency * 2.2 * 2 * np.pi * t) * envelope
-            # Reduce harsh frequencies for smoothness
-
-        elif click_type == "dry":
-            # Dry, unlubricated switches (scratchy)
-            # Rough stem movement
-            scratch_freq = 1500 + np.random.normal(0, 200)
-            scratch = np.exp(-t * 35) * np.sin(scratch_freq * 2 * np.pi * t)
-
-            # Plastic-on-plastic friction
-            friction_high = np.random.uniform(-0.2, 0.2, len(t)) * np.exp(-t * 40)
-            friction_filter = np.random.uniform(-0.1, 0.1, len(t)) * np.exp(-t * 25)
-
-            # Sharp impact
-            impact_freq = 2500 + np.random.normal(0, 300)
-            impact = np.exp(-t * 90) * np.sin(impact_freq * 2 * np.pi * t) * (t < 0.004)
-
-            # Housing rattle
-            rattle_freq = 700 + np.random.normal(0, 70)
-            rattle = np.exp(-t * 20) * np.sin(rattle_freq * 2 * np.pi * t)
-
-            sound = 0.6 * scratch + 0.4 * friction_high + 0.3 * friction_filter + 0.7 * impact + 0.4 * rattle
-
-        elif click_type == "thock":
-            # Deep thocky sound (Topre-style or thick keycaps)
-            # Deep key impact on thick material
-            thock_freq = 250 + np.random.normal(0, 25)
-            thock_impact = np.exp(-t * 15) * np.sin(thock_freq * 2 * np.pi * t)
-
-            # Dome compression (Topre-style)
-            dome_freq = 400 + np.random.normal(0, 30)
-            dome = np.exp(-t * 30) * np.sin(dome_freq * 2 * np.pi * t) * (t < 0.015)
-
-            # Case resonance (deep, wooden)
-            case_freq = 120 + np.random.normal(0, 15)
-            case_resonance = np.exp(-t * 5) * np.sin(case_freq * 2 * np.pi * t)
-
-            # Muffled high frequencies
-            muffled_freq = 1000 + np.random.normal(0, 100)
-            muffled = np.exp(-t * 80) * np.sin(muffled_freq * 2 * np.pi * t) * (t < 0.005)
-
-            sound = 0.8 * thock_impact + 0.5 * dome + 0.6 * case_resonance + 0.2 * muffled
-
-        elif click_type == "clicky":
-            # Extra clicky sound (like Box Jade/Navy)
-            envelope = np.exp(-t * 20) * (1 - np.exp(-t * 80))
-            sound = np.sin(frequency * 1.4 * 2 * np.pi * t) * envelope
-            # Add multiple click components
-            click1 = 0.6 * np.sin(frequency * 4 * 2 * np.pi * t) * np.exp(-t * 100) * (t < 0.02)
-            click2 = 0.4 * np.sin(frequency * 6 * 2 * np.pi * t) * np.exp(-t * 120) * (t < 0.015)
-            sound += click1 + click2
-
-        elif click_type == "silent":
-            # Silent switch sound (dampened)
-            envelope = np.exp(-t * 12) * (1 - np.exp(-t * 25))
-            sound = np.sin(frequency * 0.7 * 2 * np.pi * t) * envelope
-            # Very subtle harmonics
-            sound += 0.1 * np.sin(frequency * 1.8 * 2 * np.pi * t) * envelope
-            # Reduce overall volume
-            sound *= 0.5
-
-        elif click_type == "tactile":
-            # Pronounced tactile bump
-            envelope = np.exp(-t * 10) * (1 - np.exp(-t * 35))
-            # Create tactile bump effect
-            bump = (1 + 0.8 * np.exp(-((t - 0.01) / 0.005) ** 2))
-            sound = np.sin(frequency * 0.85 * 2 * np.pi * t) * envelope * bump
-            sound += 0.3 * np.sin(frequency * 2.3 * 2 * np.pi * t) * envelope
-
-        elif click_type == "lofi":
-            # Lofi chill keyboard sound (warm, soft, nostalgic)
-            envelope = np.exp(-t * 5) * (1 - np.exp(-t * 12))
-            # Warm, muffled base sound
-            sound = np.sin(frequency * 0.6 * 2 * np.pi * t) * envelope
-            # Add warm harmonics
-            sound += 0.3 * np.sin(frequency * 1.2 * 2 * np.pi * t) * envelope
-            sound += 0.2 * np.sin(frequency * 0.8 * 2 * np.pi * t) * envelope
-            # Add vinyl-like warmth
-            warmth = 0.05 * np.sin(frequency * 0.3 * 2 * np.pi * t) * envelope
-            sound += warmth
-            # Soft tape saturation effect
-            sound = np.tanh(sound * 1.5) * 0.7
-
-        elif click_type == "gx_feryn":
-            # GX Feryn style (smooth gaming sound)
-            envelope = np.exp(-t * 10) * (1 - np.exp(-t * 30))
-            sound = np.sin(frequency * 1.0 * 2 * np.pi * t) * envelope
-            # Add gaming-optimized harmonics
-            sound += 0.4 * np.sin(frequency * 2.1 * 2 * np.pi * t) * envelope
-            sound += 0.2 * np.sin(frequency * 3.3 * 2 * np.pi * t) * envelope
-            # Add subtle digital processing effect
-            digital_effect = 0.1 * np.sin(frequency * 5 * 2 * np.pi * t) * np.exp(-t * 50)
-            sound += digital_effect
-
-        elif click_type == "lee_sin":
-            # Lee Sin inspired sound (sharp, precise, martial arts-like)
-            envelope = np.exp(-t * 25) * (1 - np.exp(-t * 100))
-            sound = np.sin(frequency * 1.3 * 2 * np.pi * t) * envelope
-            # Add sharp attack like a martial arts strike
-            strike = 0.8 * np.sin(frequency * 4 * 2 * np.pi * t) * np.exp(-t * 80) * (t < 0.015)
-            sound += strike
-            # Add resonant echo
-            echo = 0.2 * np.sin(frequency * 1.5 * 2 * np.pi * t) * np.exp(-t * 15) * (t > 0.02)
-            sound += echo
-
-        elif click_type == "hacker":
-            # Hacker keyboard sound (retro terminal, Matrix-like)
-            envelope = np.exp(-t * 15) * (1 - np.exp(-t * 45))
-            # Base terminal sound
-            sound = np.sin(frequency * 1.1 * 2 * np.pi * t) * envelope
-            # Add retro computer harmonics
-            sound += 0.4 * np.sin(frequency * 2.7 * 2 * np.pi * t) * envelope
-            sound += 0.3 * np.sin(frequency * 4.1 * 2 * np.pi * t) * envelope
-            # Add digital glitch effect
-            glitch = np.random.choice([-0.1, 0, 0.1], len(sound)) * envelope * 0.3
-            sound += glitch
-            # Add terminal beep component
-            beep = 0.2 * np.sin(frequency * 6 * 2 * np.pi * t) * np.exp(-t * 60) * (t < 0.01)
-            sound += beep
-
-        elif click_type == "hard":
-            # Extremely hard mechanical keyboard sound (aggressive, loud, sharp)
-            # Violent key impact (metal hitting metal)
-            impact_freq = 3500 + np.random.normal(0, 400)
-            impact = np.exp(-t * 120) * np.sin(impact_freq * 2 * np.pi * t) * (t < 0.003)
-
-            # Aggressive spring compression
-            spring_freq = 1200 + np.random.normal(0, 150)
-            spring = np.exp(-t * 60) * np.sin(spring_freq * 2 * np.pi * t) * (t < 0.008)
-
-            # Sharp tactile bump (very pronounced)
-            bump_freq = 2000 + np.random.normal(0, 200)
-            bump = np.exp(-t * 80) * np.sin(bump_freq * 2 * np.pi * t) * (t < 0.006)
-
-            # Hard bottom-out collision
-            bottom_freq = 800 + np.random.normal(0, 100)
-            bottom = np.exp(-t * 40) * np.sin(bottom_freq * 2 * np.pi * t) * (t > 0.015) * (t < 0.03)
-
-            # Plate vibration/ringing (aggressive)
-            plate_freq = 400 + np.random.normal(0, 50)
-            plate_ring = np.exp(-t * 20) * np.sin(plate_freq * 2 * np.pi * t)
-
-            # Sharp metallic resonance
-            metal_freq = 4000 + np.random.normal(0, 500)
-            metal_ring = np.exp(-t * 100) * np.sin(metal_freq * 2 * np.pi * t) * (t < 0.004)
-
-            # Harsh friction and scratching
-            scratch = np.random.uniform(-0.3, 0.3, len(t)) * np.exp(-t * 50)
-
-            # Case resonance (deep, aggressive)
-            case_freq = 180 + np.random.normal(0, 20)
-            case_thump = np.exp(-t * 12) * np.sin(case_freq * 2 * np.pi * t)
-
-            sound = 1.0 * impact + 0.9 * spring + 0.8 * bump + 0.7 * bottom + 0.6 * plate_ring + 0.5 * metal_ring + 0.4 * scratch + 0.5 * case_thump
-
-        # Normalize and apply realistic dynamics
-        if np.max(np.abs(sound)) > 0:
-            sound = sound / np.max(np.abs(sound)) * 0.7
-
-        # Apply subtle compression for realism
-        sound = np.tanh(sound * 1.2) * 0.8
-
-        return sound.astype(np.float32)
+    def generate_release_sound(self, frequency=800, duration=0.1, click_type="blue"):
+        """Generate the upstroke sound made when a key is released"""
+        return self._render(click_type, None, frequency, duration, True)[0]
+
+    def render_variants(self, click_type, count, frequency=800, duration=0.15, release=False):
+        """Render count randomized press (or release) variants of one profile in one batch"""
+        return list(self._render(click_type, count, frequency, duration, release))
 
     def save_wav(self, sound_data, filename):
-        """Save sound data as WAV file"""
+        """Save sound data as WAV file; returns False if the file already held exactly that
+
+        Unchanged files are left alone (keeping their mtime, and with it any
+        converted copies cached by sound_format); changed ones are replaced
+        atomically, so readers never see a partial file.
+        """
         # Convert to 16-bit integers
         sound_int = (sound_data * 32767).astype(np.int16)
 
-        with wave.open(str(filename), 'w') as wav_file:
+        data = io.BytesIO()
+        with wave.open(data, 'wb') as wav_file:
             wav_file.setnchannels(1)  # Mono
             wav_file.setsampwidth(2)  # 16-bit
             wav_file.setframerate(self.sample_rate)
             wav_file.writeframes(sound_int.tobytes())
-
-        print(f"✅ Generated: {filename}")
+        data = data.getvalue()
+
+        filename = Path(filename)
+        try:
+            if filename.read_bytes() == data:
+                return False
+        except OSError:
+            pass
+        temporary = filename.with_name(f".{filename.name}.{os.getpid()}")
+        with open(str(temporary), 'wb') as f:
+            f.write(data)
+        os.replace(str(temporary), str(filename))
+        return True
+
+def render_job(rate, sound_type, frequency, duration, variants, decay_floor_db, wav_dir=None,
+               seed=DEFAULT_SEED, cache_dir=None):
+    """Render one (rate, sound type) cell of the generation matrix - runs in a worker process
+
+    Writes the type's press and release WAV files to wav_dir (if given) and
+    returns (rate, sound_type, {bank name: [variants]}, counts) for the bank
+    and the summary.
+    """
+    cache = RenderCache(cache_dir) if cache_dir is not None and seed is not None else None
+    generator = KeyboardSoundGenerator(sample_rate=rate, decay_floor_db=decay_floor_db, seed=seed, cache=cache)
+    written = 0
+    if wav_dir is not None:
+        wav_dir = Path(wav_dir)
+        written += generator.save_wav(generator.generate_click_sound(frequency, duration, sound_type),
+                                      wav_dir / f"keyboard_{sound_type}.wav")
+        # Matching upstroke sample for key release
+        written += generator.save_wav(generator.generate_release_sound(frequency, duration, sound_type),
+                                      wav_dir / f"keyboard_{sound_type}_release.wav")
+    sounds = {}
+    if variants > 0:
+        sounds[sound_type] = generator.render_variants(sound_type, variants, frequency, duration)
+        sounds[release_name(sound_type)] = generator.render_variants(sound_type, variants, frequency, duration,
+                                                                     release=True)
+    counts = {'rendered': generator.rendered, 'cached': generator.cache_hits, 'written': written}
+    return rate, sound_type, sounds, counts
+
+def write_bank(output_dir, sample_rate, sounds):
+    """Write name -> variants into the packed bank file for sample_rate
+
+    Sounds of other types already in an existing bank file are kept. Entries
+    are written in SOUND_TYPES order (press, then release; variants in index
+    order), so a partial run gives the same file as a full one. The file is
+    only replaced if its contents change; returns (path, changed).
+    """
+    path = bank_path(output_dir, sample_rate)
+    sounds = dict(sounds)
+    existing = None
+    if path.exists():
+        try:
+            existing = SoundBank.open(path)
+            for name, entries in existing.index.items():
+                if name not in sounds:
+                    sounds[name] = [np.array(existing.buffer[start:start + length]) for start, length in entries]
+        except (OSError, ValueError):
+            pass  # unreadable or older format: rewritten below
+    order = [name for sound_type in SOUND_TYPES for name in (sound_type, release_name(sound_type))]
+    known = set(order)
+    order += sorted(name for name in sounds if name not in known)
+    bank = SoundBank.from_sounds({name: sounds[name] for name in order if name in sounds}, sample_rate)
+    # Same names in the same order, same layout and same samples: the file
+    # would come out byte for byte the same
+    if (existing is not None and existing.sample_rate == sample_rate
+            and list(existing.index.items()) == list(bank.index.items())
+            and np.array_equal(existing.buffer, bank.buffer)):
+        return path, False
+    bank.save(path)
+    return path, True
+
+def run_jobs(jobs, workers):
+    """Run render_job argument tuples on a process pool, yielding results as they finish
+
+    Progress is one line rewritten in place on a terminal, not a line per file.
+    """
+    show_progress = sys.stdout.isatty()
+    pool = None
+    futures = []
+    if workers <= 1:
+        results = (render_job(*job) for job in jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = [pool.submit(render_job, *job) for job in jobs]
+        results = (future.result() for future in as_completed(futures))
+    try:
+        for done, result in enumerate(results, 1):
+            if show_progress:
+                print(f"\r⏳ Rendered {done}/{len(jobs)}", end='', flush=True)
+            yield result
+    finally:
+        if show_progress:
+            print()
+        if pool is not None:
+            for future in futures:
+                future.cancel()
+            pool.shutdown()
+
+def parse_rates(value):
+    """Comma-separated sample rates, e.g. 44100,48000"""
+    try:
+        rates = [int(rate) for rate in value.split(',') if rate.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sample rate list: {value}")
+    if not rates or min(rates) <= 0:
+        raise argparse.ArgumentTypeError(f"invalid sample rate list: {value}")
+    return list(dict.fromkeys(rates))
 
 def main():
     parser = argparse.ArgumentParser(description='Generate keyboard sounds')
-    parser.add_argument('--type', choices=['blue', 'brown', 'red', 'mechanical', 'typewriter', 'creamy', 'dry', 'thock', 'clicky', 'silent', 'tactile', 'lofi', 'gx_feryn', 'lee_sin', 'hacker', 'hard', 'all'],
+    parser.add_argument('--type', choices=SOUND_TYPES + ['all'],
                        default='all', help='Type of keyboard sound to generate')
     parser.add_argument('--duration', type=float, default=0.15, help='Sound duration in seconds')
     parser.add_argument('--frequency', type=int, default=800, help='Base frequency in Hz')
     parser.add_argument('--output', type=str, default='generated_sounds', help='Output directory')
+    parser.add_argument('--rates', '--rate', type=parse_rates, default=[44100],
+                        help='Sample rates in Hz, comma-separated (WAV files use the first; '
+                             'match the output device to skip any conversion)')
+    parser.add_argument('--variants', type=int, default=DEFAULT_VARIANTS,
+                        help='Variants per sound in the packed sound bank (0 skips the bank)')
+    parser.add_argument('--format', choices=['all', 'wav', 'bank'], default='all',
+                        help='Write WAV files, sound bank files or both')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per core)')
+    parser.add_argument('--decay-floor', type=float, default=DEFAULT_DECAY_FLOOR_DB,
+                        help='Cut decaying components off this many dB below their start level')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help='Random seed; the same seed and options give byte-identical output')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Render everything instead of reusing <output>/.cache/render')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_MB,
+                        help='Render cache cap in MiB (least recently used renders are deleted)')
 
     args = parser.parse_args()
 
@@ -306,35 +638,65 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(exist_ok=True)
 
-    generator = KeyboardSoundGenerator()
-
     if args.type == 'all':
-        sound_types = ['blue', 'brown', 'red', 'mechanical', 'typewriter', 'creamy', 'dry', 'thock', 'clicky', 'silent', 'tactile', 'lofi', 'gx_feryn', 'lee_sin', 'hacker', 'hard']
+        sound_types = SOUND_TYPES
     else:
         sound_types = [args.type]
+    write_wavs = args.format in ('all', 'wav')
+    variants = args.variants if args.format in ('all', 'bank') else 0
 
     print(f"🎵 Generating keyboard sounds...")
     print(f"📁 Output directory: {output_dir}")
     print(f"⏱️  Duration: {args.duration}s")
     print(f"🔊 Base frequency: {args.frequency}Hz")
+    print(f"🎚️  Sample rates: {', '.join(f'{rate}Hz' for rate in args.rates)}")
+    print(f"🎲 Seed: {args.seed}")
     print()
 
-    for sound_type in sound_types:
-        # Generate sound
-        sound = generator.generate_click_sound(
-            frequency=args.frequency,
-            duration=args.duration,
-            click_type=sound_type
-        )
-
-        # Save to file
-        filename = output_dir / f"keyboard_{sound_type}.wav"
-        generator.save_wav(sound, filename)
-
-    print(f"\n🎉 Generated {len(sound_types)} keyboard sounds!")
-    print(f"\n💡 Try them with your daemon:")
-    print(f"   cp {output_dir}/keyboard_blue.wav key_press.wav")
-    print(f"   ./keyboard_sound_control.sh restart")
+    # One job per (rate, type); WAV files only at the first rate, banks at every rate
+    cache_dir = None if args.no_cache else str(output_dir / '.cache' / 'render')
+    jobs = []
+    for rate in args.rates:
+        wav_dir = str(output_dir) if write_wavs and rate == args.rates[0] else None
+        if wav_dir is None and variants <= 0:
+            continue
+        for sound_type in sound_types:
+            jobs.append((rate, sound_type, args.frequency, args.duration, variants, args.decay_floor, wav_dir,
+                         args.seed, cache_dir))
+
+    workers = max(1, min(args.jobs, len(jobs)))
+    run_started = time.time()
+    started = time.monotonic()
+    results = {}
+    totals = {'rendered': 0, 'cached': 0, 'written': 0}
+    for rate, sound_type, sounds, counts in run_jobs(jobs, workers):
+        results[rate, sound_type] = sounds
+        for name, count in counts.items():
+            totals[name] += count
+    elapsed = time.monotonic() - started
+
+    if write_wavs:
+        print(f"✅ WAV files at {args.rates[0]}Hz: {totals['written']} of {len(sound_types) * 2} changed")
+    for rate in args.rates:
+        # write_bank puts the entries in a fixed order, whatever order the jobs finished in
+        sounds = {}
+        for sound_type in sound_types:
+            sounds.update(results.get((rate, sound_type), {}))
+        if sounds:
+            path, changed = write_bank(output_dir, rate, sounds)
+            print(f"📦 Sound bank: {path} ({variants} variants per sound{'' if changed else ', unchanged'})")
+
+    if cache_dir is not None:
+        pruned = RenderCache(cache_dir).prune(args.cache_size * 1048576, keep_since=run_started - 0.1)
+        if pruned:
+            print(f"🧹 Render cache: removed {pruned} unused renders (cap {args.cache_size} MiB)")
+
+    print(f"\n🎉 Generated {len(sound_types)} keyboard sounds (with release samples) "
+          f"in {elapsed:.2f}s on {workers} worker(s): "
+          f"{totals['rendered']} rendered, {totals['cached']} from cache")
+    print("\n💡 Try them with your daemon:")
+    name = sound_types[0] if len(sound_types) == 1 else '<name>'
+    print(f"   python3 keyboard_sound_control.py set-sound {name}")
 
 if __name__ == "__main__":
     main()
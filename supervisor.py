@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Worker supervision for enx-kebord
+Background loops (audio worker, command worker, device monitor) run
+under a Supervisor: a loop that raises is restarted after an exponential
+backoff, crashes are counted, and a worker that keeps crashing is given
+up on (stopping the daemon if it is critical) instead of dying silently
+and leaving a daemon that no longer plays sounds.
+"""
+
+import threading
+import time
+import traceback
+
+DEFAULT_MAX_RESTARTS = 5      # restarts allowed within the window...
+DEFAULT_RESTART_WINDOW = 60.0  # ...of this many seconds
+DEFAULT_BASE_DELAY = 0.1
+DEFAULT_MAX_DELAY = 30.0
+STABLE_AFTER = 30.0  # a worker that ran this long starts over at the base delay
+
+# Worker states
+STARTING = 'starting'
+RUNNING = 'running'
+BACKOFF = 'backoff'
+STOPPED = 'stopped'
+FAILED = 'failed'
+
+
+class Worker:
+    """Bookkeeping for one supervised loop"""
+
+    def __init__(self, name, target, critical):
+        self.name = name
+        self.target = target
+        self.critical = critical
+        self.state = STARTING
+        self.thread = None
+        self.started_at = None
+        self.crashes = 0
+        self.restarts = 0
+        self.consecutive_crashes = 0
+        self.crash_times = []
+        self.last_error = None
+        self.last_crash_at = None
+        self.traceback = None
+
+
+class Supervisor:
+    """Runs worker loops on threads and restarts them when they crash"""
+
+    def __init__(self, max_restarts=DEFAULT_MAX_RESTARTS, restart_window=DEFAULT_RESTART_WINDOW,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, on_give_up=None,
+                 on_state_change=None):
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_give_up = on_give_up  # callable(worker) for critical workers
+        self.on_state_change = on_state_change  # callable(worker), e.g. to publish health
+        self.workers = {}
+        self._stopping = threading.Event()
+
+    def spawn(self, name, target, critical=False):
+        """Run target() on a supervised daemon thread; returns the Worker"""
+        worker = Worker(name, target, critical)
+        self.workers[name] = worker
+        worker.thread = threading.Thread(target=self._run, args=(worker,), name=name, daemon=True)
+        worker.thread.start()
+        return worker
+
+    def _set_state(self, worker, state):
+        worker.state = state
+        if self.on_state_change:
+            self.on_state_change(worker)
+
+    def _run(self, worker):
+        while not self._stopping.is_set():
+            worker.started_at = time.monotonic()
+            self._set_state(worker, RUNNING)
+            try:
+                worker.target()
+                self._set_state(worker, STOPPED)  # returned normally: the loop is done
+                return
+            except Exception as e:
+                if self._stopping.is_set():
+                    self._set_state(worker, STOPPED)
+                    return
+                delay = self._record_crash(worker, e)
+            if delay is None:
+                self._set_state(worker, FAILED)
+                print(f"Worker {worker.name} crashed {worker.crashes} times, giving up: {worker.last_error}")
+                if worker.critical and self.on_give_up:
+                    self.on_give_up(worker)
+                return
+            self._set_state(worker, BACKOFF)
+            print(f"Worker {worker.name} crashed ({worker.last_error}), restarting in {delay:.1f}s")
+            # Sleeps for the backoff but returns at once on stop()
+            if self._stopping.wait(delay):
+                break
+            worker.restarts += 1
+        self._set_state(worker, STOPPED)
+
+    def _record_crash(self, worker, error):
+        """Count a crash; returns the backoff delay or None if the restart limit is hit"""
+        now = time.monotonic()
+        worker.crashes += 1
+        worker.last_error = f"{type(error).__name__}: {error}"
+        worker.last_crash_at = time.time()
+        worker.traceback = traceback.format_exc()
+        if now - worker.started_at >= STABLE_AFTER:
+            worker.consecutive_crashes = 0
+        worker.consecutive_crashes += 1
+        worker.crash_times = [t for t in worker.crash_times if now - t < self.restart_window]
+        worker.crash_times.append(now)
+        if len(worker.crash_times) > self.max_restarts:
+            return None
+        return min(self.base_delay * (2 ** (worker.consecutive_crashes - 1)), self.max_delay)
+
+    def stop(self):
+        """Stop restarting workers (their loops end through their own stop paths)"""
+        self._stopping.set()
+
+    def health(self):
+        """Per-worker state snapshot for status reports"""
+        now = time.monotonic()
+        return {
+            name: {
+                'state': worker.state,
+                'alive': bool(worker.thread and worker.thread.is_alive()),
+                'critical': worker.critical,
+                'crashes': worker.crashes,
+                'restarts': worker.restarts,
+                'uptime_s': round(now - worker.started_at, 1)
+                if worker.started_at and worker.state == RUNNING else 0.0,
+                'last_error': worker.last_error,
+                'last_crash_at': worker.last_crash_at,
+            }
+            for name, worker in self.workers.items()
+        }
+
+    def healthy(self):
+        """False once any critical worker has failed"""
+        return not any(worker.critical and worker.state == FAILED for worker in self.workers.values())
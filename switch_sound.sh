@@ -49,6 +49,11 @@ switch_sound() {
     fi
     
     echo "🎵 Switching to ${sound_type} keyboard sound..."
+    # A running daemon switches in-process from its preloaded sound bank
+    if ./keyboard_sound_control.sh set-sound "$sound_type" > /dev/null 2>&1; then
+        echo "✅ Now using ${sound_type} keyboard sound!"
+        return
+    fi
     cp "$sound_file" key_press.wav
     
     echo "🔄 Restarting daemon..."
@@ -16,6 +16,8 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 import pygame
 import time
 
+from sound_format import open_mixer, mixer_sound
+
 def test_audio():
     # Use current repo directory
     sound_file = Path(__file__).resolve().parent / "key_press.wav"
@@ -29,11 +31,11 @@ def test_audio():
     
     try:
         print("Initializing pygame mixer...")
-        pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
-        pygame.mixer.init()
+        rate, size, channels = open_mixer()
+        print(f"Mixer format: {rate} Hz, {abs(size)}-bit, {channels} ch")
         
         print("Loading audio file...")
-        sound = pygame.mixer.Sound(str(sound_file))
+        sound = mixer_sound(sound_file)
         
         print("Playing sound...")
         ch = sound.play()
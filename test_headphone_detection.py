@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
 """
 Test headphone detection manually
+
+Usage:
+  python3 test_headphone_detection.py                  # probe this machine
+  python3 test_headphone_detection.py --capture DIR    # save a fixture tree
+  python3 test_headphone_detection.py --root DIR       # probe a fixture tree offline
+  python3 test_headphone_detection.py --check          # check every tree in fixtures/audio_devices
+
+A fixture tree holds an `expected` file ("headphones" or "speakers") for --check.
 """
 import os, sys
 from pathlib import Path
@@ -11,101 +19,122 @@ VENV_PY = BASE / 'venv' / 'bin' / 'python3'
 if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
     os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
 
-import subprocess
+import argparse
+import shutil
+import time
+
+from audio_devices import AudioProbe, read_switch_state
+
+FIXTURE_DIR = BASE / 'fixtures' / 'audio_devices'
+
+def capture_fixture(target):
+    """Copy the files the probes read into a fixture tree under target"""
+    probe = AudioProbe('/', allow_subprocess=False)
+    target = Path(target)
+
+    def copy(relative):
+        source = Path('/') / relative
+        if source.is_file():
+            destination = target / relative
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(str(source), str(destination))
+
+    copy('proc/asound/cards')
+    for card in probe.cards():
+        copy(f"proc/asound/card{card['number']}/usbid")
+        card_dir = Path(f"/proc/asound/card{card['number']}")
+        for entry in sorted(os.listdir(str(card_dir))) if card_dir.is_dir() else []:
+            if entry.startswith('pcm'):
+                copy(f"proc/asound/card{card['number']}/{entry}/info")
+        link = Path(f"/sys/class/sound/card{card['number']}/device")
+        if link.is_symlink():
+            destination = target / f"sys/class/sound/card{card['number']}/device"
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            os.symlink(os.readlink(str(link)), str(destination))
+
+    for entry in sorted(os.listdir('/sys/class/input')) if os.path.isdir('/sys/class/input') else []:
+        copy(f"sys/class/input/{entry}/name")
+        entry_dir = Path('/sys/class/input') / entry
+        for child in os.listdir(str(entry_dir)) if entry_dir.is_dir() else []:
+            if child.startswith('event'):
+                (target / f"sys/class/input/{entry}/{child}").mkdir(parents=True, exist_ok=True)
+                state = read_switch_state(f"/dev/input/{child}")
+                if state is not None:
+                    # Store the switch bitmask in place of the device node
+                    node = target / f"dev/input/{child}"
+                    node.parent.mkdir(parents=True, exist_ok=True)
+                    node.write_text(f"{state:#x}\n")
+
+    bluetooth = target / 'sys/class/bluetooth'
+    bluetooth.mkdir(parents=True, exist_ok=True)
+    for entry in os.listdir('/sys/class/bluetooth') if os.path.isdir('/sys/class/bluetooth') else []:
+        (bluetooth / entry).mkdir(exist_ok=True)
+    print(f"📦 Fixture tree written to {target}")
+    print(f"   Add {target / 'expected'} (headphones or speakers) to use it with --check")
 
-def test_detection():
+def test_detection(root='/', allow_subprocess=True):
     print("🎧 Testing Headphone Detection Methods:")
     print("=" * 50)
-    
-    headphone_detected = False
-    
-    # Method 1: PulseAudio/PipeWire
-    print("\n1. PulseAudio/PipeWire Detection:")
-    try:
-        result = subprocess.run(['pactl', 'list', 'sinks'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            output_lower = result.stdout.lower()
-            headphone_indicators = ['headphone', 'headset', 'usb audio', 'usb-audio', 'usb_audio']
-            found_indicators = [ind for ind in headphone_indicators if ind in output_lower]
-            if found_indicators:
-                print(f"   ✅ Found: {found_indicators}")
-                headphone_detected = True
-            else:
-                print("   ❌ No headphone indicators found")
-            print(f"   📝 Output sample: {output_lower[:200]}...")
-        else:
-            print("   ❌ pactl command failed")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
-    # Method 2: ALSA
-    print("\n2. ALSA Detection:")
-    try:
-        result = subprocess.run(['aplay', '-l'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            output_lower = result.stdout.lower()
-            usb_indicators = ['usb audio', 'usb-audio', 'headphone', 'headset']
-            found_indicators = [ind for ind in usb_indicators if ind in output_lower]
-            if found_indicators:
-                print(f"   ✅ Found: {found_indicators}")
-                headphone_detected = True
-            else:
-                print("   ❌ No USB/headphone indicators found")
-            print(f"   📝 Output: {result.stdout}")
-        else:
-            print("   ❌ aplay command failed")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
-    # Method 3: /proc/asound/cards
-    print("\n3. /proc/asound/cards Detection:")
-    try:
-        with open('/proc/asound/cards', 'r') as f:
-            cards_content = f.read().lower()
-            indicators = ['usb-audio', 'headphone', 'headset']
-            found_indicators = [ind for ind in indicators if ind in cards_content]
-            if found_indicators:
-                print(f"   ✅ Found: {found_indicators}")
-                headphone_detected = True
-            else:
-                print("   ❌ No headphone indicators found")
-            print(f"   📝 Content: {cards_content}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
-    # Method 4: Bluetooth
-    print("\n4. Bluetooth Detection:")
-    try:
-        bt_result = subprocess.run(['bluetoothctl', 'devices'], capture_output=True, text=True, timeout=3)
-        if bt_result.returncode == 0 and bt_result.stdout.strip():
-            bt_devices = bt_result.stdout.lower()
-            print(f"   📝 Bluetooth devices: {bt_result.stdout}")
-            
-            bt_info = subprocess.run(['bluetoothctl', 'info'], capture_output=True, text=True, timeout=3)
-            if 'connected: yes' in bt_info.stdout.lower():
-                audio_indicators = ['headphone', 'headset', 'speaker', 'audio']
-                found_indicators = [ind for ind in audio_indicators if ind in bt_devices]
-                if found_indicators:
-                    print(f"   ✅ Found connected: {found_indicators}")
-                    headphone_detected = True
-                else:
-                    print("   ❌ No audio devices connected")
-            else:
-                print("   ❌ No Bluetooth devices connected")
-        else:
-            print("   ❌ No Bluetooth devices found")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
+    probe = AudioProbe(root, allow_subprocess=allow_subprocess)
+
+    print(f"\n1. Sound cards ({probe.path('proc', 'asound', 'cards')}):")
+    cards = probe.cards()
+    for card in cards:
+        bus = "USB" if card['usb'] else "internal"
+        output = "playback" if card['playback'] else "no playback"
+        print(f"   🔊 card{card['number']} [{card['id']}] {card['driver']} - {card['name']} ({bus}, {output})")
+    if not cards:
+        print("   ❌ No ALSA cards found")
+
+    print("\n2. Headphone jack switches:")
+    jacks = probe.jacks()
+    for jack in jacks:
+        state = {True: "✅ plugged", False: "❌ unplugged", None: "❓ unreadable"}[jack['plugged']]
+        print(f"   {state}: {jack['name']}")
+    if not jacks:
+        print("   ❌ No jack switch devices found")
+
+    print(f"\n3. Bluetooth connections: {probe.bluetooth_links()}")
+
+    start = time.perf_counter()
+    result = probe.probe()
+    elapsed = (time.perf_counter() - start) * 1000.0
+
     print("\n" + "=" * 50)
-    print(f"🎯 FINAL RESULT: {'🎧 Headphones DETECTED' if headphone_detected else '🔊 Speakers/No headphones detected'}")
-    
-    if headphone_detected:
+    print(f"🎯 FINAL RESULT: {'🎧 Headphones DETECTED' if result['headphones'] else '🔊 Speakers/No headphones detected'}")
+    print(f"   Reason: {result['reason']} (via {result['method']}, {elapsed:.2f} ms)")
+
+    if result['headphones']:
         print("🔉 Volume will be set to 10% (very quiet)")
     else:
         print("🔊 Volume will be set to 80% (normal)")
-    
-    return headphone_detected
+
+    return result['headphones']
+
+def check_fixtures(directory=FIXTURE_DIR):
+    """Probe every captured fixture tree offline and compare with its expected result"""
+    failures = 0
+    trees = sorted(path.parent for path in Path(directory).glob('*/expected'))
+    for tree in trees:
+        expected = (tree / 'expected').read_text().strip() == 'headphones'
+        result = AudioProbe(str(tree), allow_subprocess=False).probe()
+        ok = result['headphones'] == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {tree.name}: {result['reason']} (via {result['method']})")
+    print(f"\n{len(trees) - failures}/{len(trees)} fixture trees detected correctly")
+    return failures == 0 and bool(trees)
 
 if __name__ == "__main__":
-    test_detection()
+    parser = argparse.ArgumentParser(description='Test headphone detection')
+    parser.add_argument('--root', type=str, default='/', help='Probe a captured fixture tree instead of /')
+    parser.add_argument('--capture', type=str, help='Capture this machine into a fixture tree')
+    parser.add_argument('--check', nargs='?', const=str(FIXTURE_DIR), metavar='DIR',
+                        help='Check every fixture tree under DIR against its expected result')
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(0 if check_fixtures(args.check) else 1)
+    if args.capture:
+        capture_fixture(args.capture)
+    else:
+        # Fixture trees are probed offline, without asking pactl
+        test_detection(args.root, allow_subprocess=args.root == '/')
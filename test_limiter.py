@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test that the mixer's limiter gives the gain back within its release time
+
+Usage:
+  python3 test_limiter.py
+
+Overlapping clicks push the mix over the threshold; once they have
+finished, the limiter gain must be back at 1.0 within limiter_release_ms
+and a lone click afterwards must play at full level. Runs offline (no
+audio device) for a few buffer sizes and sample rates.
+"""
+import os, sys
+from pathlib import Path
+
+# Ensure venv is used
+BASE = Path(__file__).resolve().parent
+VENV_PY = BASE / 'venv' / 'bin' / 'python3'
+if VENV_PY.exists() and Path(sys.executable) != VENV_PY:
+    os.execv(str(VENV_PY), [str(VENV_PY), __file__] + sys.argv[1:])
+
+import numpy as np
+
+from audio_engine import MixerEngine, DEFAULT_LIMITER_RELEASE_MS
+
+CASES = [(44100, 256), (48000, 1024), (48000, 64)]
+
+def click(sample_rate, level=0.5, seconds=0.05):
+    """A decaying tone burst peaking at `level`"""
+    t = np.arange(int(sample_rate * seconds), dtype=np.float32) / sample_rate
+    return (level * np.sin(2 * np.pi * 2000 * t) * np.exp(-t * 60)).astype(np.float32)
+
+def render_seconds(engine, seconds):
+    """Render `seconds` of audio and return its peak"""
+    out = np.zeros((engine.buffer_frames, engine.channels), dtype=np.float32)
+    peak = 0.0
+    for _ in range(int(np.ceil(seconds * engine.sample_rate / engine.buffer_frames))):
+        engine.render(out)
+        peak = max(peak, float(np.max(np.abs(out))))
+    return peak
+
+def check_release(sample_rate, buffer_frames, release_ms=DEFAULT_LIMITER_RELEASE_MS):
+    engine = MixerEngine(sample_rate=sample_rate, buffer_frames=buffer_frames,
+                         limiter_release_ms=release_ms)
+    samples = click(sample_rate)
+    alone = float(np.max(np.abs(samples)))
+
+    for _ in range(4):
+        engine.trigger(samples)
+    loud = render_seconds(engine, buffer_frames / sample_rate)
+    reduced = engine._limiter_gain
+    loud = max(loud, render_seconds(engine, len(samples) / sample_rate))
+
+    # One more block after the release time covers the partial block at the end
+    render_seconds(engine, release_ms / 1000.0 + buffer_frames / sample_rate)
+    recovered = engine._limiter_gain
+
+    engine.trigger(samples)
+    later = render_seconds(engine, len(samples) / sample_rate)
+
+    ok = reduced < 1.0 and recovered == 1.0 and abs(later - alone) < 1e-3
+    print(f"{'✅' if ok else '❌'} {sample_rate} Hz, {buffer_frames}-frame blocks: "
+          f"4 clicks peak {loud:.2f} (gain {reduced:.2f}), gain {recovered:.3f} after {release_ms:.0f} ms, "
+          f"lone click {later:.2f} (alone {alone:.2f})")
+    return ok
+
+if __name__ == "__main__":
+    results = [check_release(rate, frames) for rate, frames in CASES]
+    print(f"\n{sum(results)}/{len(results)} limiter release checks passed")
+    sys.exit(0 if all(results) else 1)
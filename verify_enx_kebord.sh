@@ -98,11 +98,11 @@ fi
 
 step "Checking venv usage in control script"
 if grep -q 'VENV_PYTHON="\$SCRIPT_DIR/venv/bin/python3"' keyboard_sound_control.sh && \
-   grep -q '"\$VENV_PYTHON" "\$DAEMON_PATH" \&' keyboard_sound_control.sh; then
-  ok "keyboard_sound_control.sh launches daemon via venv"
+   grep -q 'exec "\$VENV_PYTHON" "\$CONTROL_PATH"' keyboard_sound_control.sh; then
+  ok "keyboard_sound_control.sh runs keyboard_sound_control.py via venv"
 else
   warn "keyboard_sound_control.sh is not venv-enforced"
-  add_summary "Ensure keyboard_sound_control.sh uses VENV_PYTHON to start the daemon"
+  add_summary "Ensure keyboard_sound_control.sh runs keyboard_sound_control.py with VENV_PYTHON"
 fi
 
 step "Checking desktop templates"